@@ -0,0 +1,94 @@
+import copy
+import glob
+import json
+import os
+import re
+import threading
+import time
+from boto3.dynamodb.types import TypeDeserializer
+
+from bulletin_data import KEY_NAMES
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dynamodb')
+
+
+def load_fixtures(directory=FIXTURE_DIR):
+    # Read the typed JSON documents out of the insert_*.sh scripts used with DynamoDB Local
+    deserializer = TypeDeserializer()
+    tables = {name: {} for name in KEY_NAMES}
+    for path in sorted(glob.glob(os.path.join(directory, 'insert_*.sh'))):
+        with open(path) as f:
+            script = f.read()
+        table_name = re.search(r'TABLE_NAME="(\w+)"', script).group(1)
+        document = json.loads(re.search(r"JSON_DOC='(.*?)'", script, re.S).group(1))
+        item = {key: deserializer.deserialize(value) for key, value in document.items()}
+        tables[table_name][item[KEY_NAMES[table_name]]] = item
+    return tables
+
+
+def projected(item, ProjectionExpression=None, ExpressionAttributeNames=None, **kwargs):
+    # A copy of item limited to the top-level attributes a ProjectionExpression names
+    if ProjectionExpression is None:
+        return copy.deepcopy(item)
+    names = ExpressionAttributeNames or {}
+    attributes = [names.get(name.strip(), name.strip()) for name in ProjectionExpression.split(',')]
+    return {name: copy.deepcopy(item[name]) for name in attributes if name in item}
+
+
+class FakeTable():
+    def __init__(self, resource, name):
+        self.resource = resource
+        self.name = name
+        self.key_name = KEY_NAMES[name]
+
+    def get_item(self, Key, **kwargs):
+        self.resource._request('GetItem')
+        item = self.resource.tables[self.name].get(Key[self.key_name])
+        if item is None:
+            return {}
+        item = projected(item, **kwargs)
+        self.resource._returned('GetItem', [item])
+        return {'Item': item}
+
+    def put_item(self, Item, **kwargs):
+        self.resource._request('PutItem')
+        self.resource.tables[self.name][Item[self.key_name]] = copy.deepcopy(Item)
+        return {}
+
+
+class FakeDynamoDB():
+    # In-process stand-in for boto3.resource('dynamodb') holding the two bulletin tables.
+    # latency adds a fixed delay to every request to model a network round trip.
+    def __init__(self, tables=None, latency=0):
+        self.tables = tables if tables is not None else load_fixtures()
+        self.latency = latency
+        self.requests = {}
+        # Approximate size of the items returned by each operation, as JSON
+        self.response_bytes = {}
+        self.lock = threading.Lock()
+
+    def _request(self, operation):
+        with self.lock:
+            self.requests[operation] = self.requests.get(operation, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _returned(self, operation, items):
+        size = sum(len(json.dumps(item, default=str)) for item in items)
+        with self.lock:
+            self.response_bytes[operation] = self.response_bytes.get(operation, 0) + size
+
+    def Table(self, name):
+        return FakeTable(self, name)
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        self._request('BatchGetItem')
+        responses = {}
+        for table_name, request in RequestItems.items():
+            key_name = KEY_NAMES[table_name]
+            items = self.tables[table_name]
+            responses[table_name] = [
+                projected(items[key[key_name]], **request) for key in request['Keys'] if key[key_name] in items
+            ]
+            self._returned('BatchGetItem', responses[table_name])
+        return {'Responses': responses, 'UnprocessedKeys': {}}
@@ -0,0 +1,186 @@
+import argparse
+import copy
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# The builder loads pilgrim.PNG relative to the repository root; reports stay relative to the caller
+INVOCATION_DIR = os.getcwd()
+os.chdir(REPO_ROOT)
+
+import reportlab
+
+import bulletin_assets
+import bulletin_static
+import bulletin_templates
+from bulletin_builder import BulletinBuilder, BulletinRender
+from bulletin_data import BulletinData, iter_bulletin_data, prefetch_bulletin_data
+from fake_dynamodb import FakeDynamoDB, load_fixtures
+
+FIXTURE_DATE = '2023-08-20'
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def summarize(samples):
+    # The first sample pays for cold caches; the rest show the warm steady state
+    warm = samples[1:] or samples
+    return {
+        'cold': samples[0],
+        'median': statistics.median(warm),
+        'min': min(warm),
+        'mean': statistics.fmean(warm),
+    }
+
+
+def with_announcements(tables, count):
+    # The fixture bulletin with its announcements repeated up to count entries
+    tables = copy.deepcopy(tables)
+    params = tables['BulletinParams'][FIXTURE_DATE]
+    announcements = params['announcements']
+    params['announcements'] = [announcements[i % len(announcements)] for i in range(count)]
+    return tables
+
+
+def with_weeks(tables, weeks):
+    # The fixture bulletin copied onto each Sunday of a year
+    tables = copy.deepcopy(tables)
+    params = tables['BulletinParams'][FIXTURE_DATE]
+    first = date.fromisoformat(FIXTURE_DATE)
+    dates = []
+    for week in range(weeks):
+        service_date = (first + timedelta(weeks=week)).isoformat()
+        tables['BulletinParams'][service_date] = dict(copy.deepcopy(params), service_date=service_date)
+        dates.append(service_date)
+    return tables, dates
+
+
+def bench_stages(builder, dynamodb, service_date, iterations):
+    # Time each stage of one bulletin separately; story includes OOW templating
+    stages = {'fetch': [], 'generate_oow': [], 'story': [], 'doc_build': [], 'total': []}
+    pdf_bytes = 0
+    for _ in range(iterations):
+        fetch, data = timed(lambda: BulletinData(service_date, dynamodb=dynamodb))
+        generate_oow, _ = timed(lambda: [data.generate_oow(service) for service in ('morning', 'evening')])
+        render = BulletinRender(builder, data)
+        story, _ = timed(render.build_story)
+        buffer = io.BytesIO()
+        doc_build, _ = timed(lambda: builder.new_doc(buffer).build(render.story))
+        pdf_bytes = len(buffer.getvalue())
+        for name, value in (('fetch', fetch), ('generate_oow', generate_oow), ('story', story), ('doc_build', doc_build)):
+            stages[name].append(value)
+        stages['total'].append(fetch + story + doc_build)
+    result = {name: summarize(samples) for name, samples in stages.items()}
+    result['pdf_bytes'] = pdf_bytes
+    result['requests'] = dict(dynamodb.requests)
+    result['response_bytes'] = dict(dynamodb.response_bytes)
+    return result
+
+
+def bench_batch(builder, dynamodb, dates, iterations):
+    # Prefetch a whole batch, then render every date with one warm builder; pipelined
+    # fetches later dates on a background thread while earlier ones render
+    samples = {'prefetch': [], 'render': [], 'total': [], 'pipelined': []}
+    for _ in range(iterations):
+        prefetch, prefetched = timed(lambda: prefetch_bulletin_data(dates, dynamodb=dynamodb))
+        render, _ = timed(lambda: [builder.render(service_date, data=prefetched[service_date]) for service_date in dates])
+        pipelined, _ = timed(lambda: [builder.render(service_date, data=data) for service_date, data in iter_bulletin_data(dates, dynamodb=dynamodb)])
+        samples['prefetch'].append(prefetch)
+        samples['render'].append(render)
+        samples['total'].append(prefetch + render)
+        samples['pipelined'].append(pipelined)
+    result = {name: summarize(values) for name, values in samples.items()}
+    result['per_bulletin'] = result['total']['median'] / len(dates)
+    result['bulletins'] = len(dates)
+    result['requests'] = dict(dynamodb.requests)
+    result['response_bytes'] = dict(dynamodb.response_bytes)
+    return result
+
+
+def run(iterations, latency):
+    fixtures = load_fixtures()
+    builder = BulletinBuilder()
+    scenarios = {}
+    for service_date in sorted(fixtures['BulletinParams']):
+        scenarios[f"fixture-{service_date}"] = bench_stages(builder, FakeDynamoDB(fixtures, latency), service_date, iterations)
+    scenarios['announcements-40'] = bench_stages(builder, FakeDynamoDB(with_announcements(fixtures, 40), latency), FIXTURE_DATE, iterations)
+    tables, dates = with_weeks(fixtures, 52)
+    scenarios['batch-52'] = bench_batch(builder, FakeDynamoDB(tables, latency), dates, max(2, iterations // 5))
+    return scenarios
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline, threshold):
+    # Print warm medians side by side and return the stages that got slower than the threshold
+    regressions = []
+    for scenario, stages in report['scenarios'].items():
+        for stage, values in stages.items():
+            if not isinstance(values, dict) or 'median' not in values:
+                continue
+            old = baseline.get('scenarios', {}).get(scenario, {}).get(stage)
+            if not old:
+                continue
+            change = (values['median'] - old['median']) / old['median'] if old['median'] else 0
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressions.append(f"{scenario}/{stage}")
+            print(f"{scenario:24} {stage:14} {old['median'] * 1000:9.2f} ms -> {values['median'] * 1000:9.2f} ms  {change:+7.1%}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time each stage of a bulletin build against an in-process DynamoDB stand-in.")
+    parser.add_argument('-n', '--iterations', type=int, default=10, help="Builds per scenario (default: %(default)s)")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Simulated DynamoDB round-trip latency")
+    parser.add_argument('-o', '--output', default='benchmark.json', help="JSON report to write (default: %(default)s)")
+    parser.add_argument('--compare', help="Earlier JSON report to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Slowdown that counts as a regression (default: %(default)s)")
+    args = parser.parse_args()
+
+    # Keep on-disk asset and layout caches out of the repository and start them cold
+    with tempfile.TemporaryDirectory() as cache_dir:
+        bulletin_assets.configure(os.path.join(cache_dir, 'assets'))
+        bulletin_static.configure(os.path.join(cache_dir, 'static'))
+        bulletin_templates.configure()
+        scenarios = run(args.iterations, args.latency_ms / 1000)
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'reportlab': reportlab.Version,
+        'iterations': args.iterations,
+        'latency_ms': args.latency_ms,
+        'scenarios': scenarios,
+    }
+    output = os.path.join(INVOCATION_DIR, args.output)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(os.path.join(INVOCATION_DIR, args.compare)) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} stages regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
@@ -1,363 +1,254 @@
-# Import necessary modules from ReportLab
-from reportlab.lib.pagesizes import LETTER, landscape
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors, utils
-from reportlab.graphics.shapes import Rect, Drawing
-from reportlab.platypus import (
-    BaseDocTemplate, PageTemplate, PageBreak, Frame, FrameBreak, Spacer, Paragraph, Table, TableStyle, Image
-)
-from reportlab.platypus.flowables import Flowable
-from reportlab.lib.enums import TA_RIGHT
+import time
+# Taken before anything else is imported so --startup-time can tell interpreter
+# start-up apart from our own imports
+STARTED = time.perf_counter()
+INTERPRETER_CPU = time.process_time()
+
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
 
 # CUSTOM CODE
-from bulletin_data import BulletinData
-import bulletin_constants
+# These stay light to import; ReportLab, Jinja and boto3 are only loaded on the paths that use them
+from bulletin_data import BulletinData, PARAMS_TABLE, OOW_TABLE, fetch_params_range, iter_bulletin_data
+import bulletin_assets
+import bulletin_backends
+import bulletin_batch
+import bulletin_cache
+import bulletin_metrics
+import bulletin_profile
+import bulletin_render_cache
+import bulletin_watch
+
+# Modules worth knowing about when start-up is slow
+HEAVY_MODULES = ('boto3', 'jinja2', 'reportlab', 'PIL')
+
+
+def next_sunday():
+    today = date.today()
+    return (today + timedelta(days=(6 - today.weekday()) % 7)).isoformat()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build Pilgrim bulletin PDFs.")
+    parser.add_argument('dates', nargs='*', help="Service dates (YYYY-MM-DD). Defaults to the coming Sunday.")
+    parser.add_argument('--start', help="First service date of a range to build")
+    parser.add_argument('--end', help="Last service date of a range to build (inclusive)")
+    parser.add_argument('--step', type=int,
+                        help="Build every this many days of a range, whether or not a bulletin exists for the date. "
+                             "Without it a range builds the bulletins stored for dates in it, found with one query.")
+    parser.add_argument('--list', action='store_true', help="Print the service dates that would be built, and stop")
+    parser.add_argument('-o', '--output', default='bulletin.pdf', help="Output file for a single bulletin")
+    parser.add_argument('--output-dir', help="Directory for per-date output files (batch builds)")
+    parser.add_argument('--combine', metavar='FILE',
+                        help="Write every date into this one PDF, e.g. a print job, sharing the logo, forms and fonts")
+    parser.add_argument('--stream-encoding', choices=['ascii85', 'binary', 'none'], default='ascii85',
+                        help="How a combined PDF stores page streams and images; binary skips ASCII85 text encoding (default: %(default)s)")
+    parser.add_argument('--size-report', action='store_true',
+                        help="With --combine, also render each date separately and report the bytes saved")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running and re-render whenever a bulletin's data or the logo changes")
+    parser.add_argument('--watch-interval', type=float, default=bulletin_watch.DEFAULT_INTERVAL, help="Seconds between checks in --watch mode (default: %(default)s)")
+    parser.add_argument('--workers', type=int, help="Number of worker processes for batch builds")
+    parser.add_argument('--max-tasks-per-worker', type=int, default=bulletin_batch.DEFAULT_MAX_TASKS_PER_WORKER,
+                        help="Bulletins a worker renders before it is recycled")
+    parser.add_argument('--template-cache-dir', help="Directory for Jinja bytecode of compiled orders of worship")
+    parser.add_argument('--cache', action='store_true', help="Cache fetched DynamoDB items in a local SQLite file")
+    parser.add_argument('--cache-path', default=bulletin_cache.DEFAULT_CACHE_PATH, help="SQLite file used by --cache (default: %(default)s)")
+    parser.add_argument('--cache-ttl', type=float, default=bulletin_cache.DEFAULT_TTL,
+                        help="Seconds before a cached item is fetched again (default: %(default)s)")
+    parser.add_argument('--refresh', action='store_true', help="Invalidate cached items for these dates first")
+    parser.add_argument('--data-dir',
+                        help="Read bulletin params and orders of worship from a directory of JSON files instead of DynamoDB")
+    parser.add_argument('--endpoint-url', default=bulletin_backends.DEFAULT_ENDPOINT, help="DynamoDB endpoint (default: %(default)s)")
+    parser.add_argument('--max-connections', type=int, default=bulletin_backends.DEFAULT_MAX_POOL_CONNECTIONS,
+                        help="HTTP connections to DynamoDB kept open and shared by every fetching thread (default: %(default)s)")
+    parser.add_argument('--offline', action='store_true', help="Render only from the cache, never contacting DynamoDB")
+    parser.add_argument('--logo-dpi', type=int, default=bulletin_assets.DEFAULT_DPI,
+                        help="Print resolution the logo is prepared for (default: %(default)s)")
+    parser.add_argument('--logo-format', choices=['JPEG', 'PNG'], type=str.upper, default=bulletin_assets.DEFAULT_FORMAT,
+                        help="Format of the prepared logo; PNG is lossless but larger and slower (default: %(default)s)")
+    parser.add_argument('--render-cache', action='store_true', help="Reuse previously rendered PDFs whose inputs have not changed")
+    parser.add_argument('--render-cache-dir', default=bulletin_render_cache.DEFAULT_RENDER_CACHE_DIR,
+                        help="Directory used by --render-cache (default: %(default)s)")
+    parser.add_argument('--render-cache-size', type=float, default=bulletin_render_cache.DEFAULT_MAX_BYTES / 1024 / 1024,
+                        help="Megabytes of PDFs kept in the render cache (default: %(default)s)")
+    parser.add_argument('--auto-fit', action='store_true',
+                        help="Shrink text in the announcement, welcome and confession boxes until it fits")
+    parser.add_argument('--strict-params', action='store_true',
+                        help="Fail a bulletin whose order of worship uses params it does not have, instead of warning")
+    parser.add_argument('--metrics-log', help="Append a JSON line per build stage, then a summary, to this file")
+    parser.add_argument('--metrics-file', help="Write stage timings and counters in Prometheus text format to this file")
+    parser.add_argument('--startup-time', action='store_true',
+                        help="Report interpreter start-up, import, worker start-up and build times on stderr")
+    parser.add_argument('--profile', metavar='DIR',
+                        help="Sample the build and write a stage breakdown and top functions (profile.txt) and "
+                             "collapsed stacks for flame graphs (profile.collapsed) to this directory. Batches render in this process.")
+    parser.add_argument('--profile-interval', type=float, default=bulletin_profile.DEFAULT_INTERVAL * 1000,
+                        help="Milliseconds between profile samples (default: %(default)s)")
+    parser.add_argument('--profile-top', type=int, default=bulletin_profile.DEFAULT_TOP,
+                        help="Functions listed in the profile report (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.profile and args.watch:
+        parser.error("--profile cannot be used with --watch")
+    if args.offline and args.refresh:
+        parser.error("--refresh cannot be used with --offline")
+    if args.offline or args.refresh:
+        args.cache = True
+    if bool(args.start) != bool(args.end):
+        parser.error("--start and --end must be given together")
+    return args
+
+
+def report_startup(ready, finished, recorder):
+    spans = recorder.summary()['spans']
+    lines = [
+        f"interpreter start-up: {INTERPRETER_CPU * 1000:.1f} ms CPU",
+        f"imports and setup:    {(ready - STARTED) * 1000:.1f} ms",
+        f"building:             {(finished - ready) * 1000:.1f} ms",
+    ]
+    if 'build' in spans:
+        lines.append(f"slowest bulletin:     {spans['build']['max_seconds'] * 1000:.1f} ms")
+    if 'worker_init' in spans:
+        workers = spans['worker_init']
+        lines.append(f"worker start-up:      {workers['seconds'] / workers['count'] * 1000:.1f} ms average over {workers['count']} workers")
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    lines.append(f"heavy modules loaded: {', '.join(loaded) or 'none'}")
+    print("\n".join(lines), file=sys.stderr)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.metrics_log or args.metrics_file or args.startup_time:
+        bulletin_metrics.enable(args.metrics_log)
+    bulletin_assets.configure(dpi=args.logo_dpi, image_format=args.logo_format)
+    if args.template_cache_dir:
+        import bulletin_templates
+        bulletin_templates.configure(bytecode_cache_dir=args.template_cache_dir)
+    dates = list(args.dates)
+    if args.start and args.step:
+        dates += bulletin_batch.service_dates(args.start, args.end, args.step)
+
+    bulletin_backends.configure_connections(endpoint_url=args.endpoint_url, max_pool_connections=args.max_connections)
+    if args.data_dir:
+        bulletin_backends.configure(bulletin_backends.FileBackend(args.data_dir))
+
+    if args.render_cache:
+        bulletin_render_cache.configure(args.render_cache_dir, int(args.render_cache_size * 1024 * 1024))
+
+    cache = None
+    if args.cache:
+        cache = bulletin_cache.configure(args.cache_path, ttl=args.cache_ttl, offline=args.offline)
+
+    params_by_date = {}
+    if args.start and not args.step:
+        # A range reads only the bulletins that exist (fresh from the source unless offline),
+        # and the build reuses their params
+        params_by_date = fetch_params_range(args.start, args.end)
+        if not params_by_date:
+            print(f"No bulletins found from {args.start} to {args.end}")
+            return 1
+        dates += list(params_by_date)
+    if not dates:
+        dates = [next_sunday()]
+    dates = list(dict.fromkeys(dates))
+    if args.refresh:
+        # Only once every date is known: an empty list of keys would invalidate the whole table.
+        # Orders of worship are shared between dates, so drop them all.
+        cache.invalidate(PARAMS_TABLE, dates)
+        cache.invalidate(OOW_TABLE)
+    if args.list:
+        print("\n".join(dates))
+        return 0
+
+    profiler = None
+    if args.profile:
+        profiler = bulletin_profile.Sampler(args.profile_interval / 1000)
+        profiler.start()
+
+    failed = []
+    if args.watch:
+        from bulletin_builder import BulletinBuilder
+        ready = time.perf_counter()
+        if len(dates) == 1 and args.output_dir is None:
+            outputs = {dates[0]: args.output}
+        else:
+            os.makedirs(args.output_dir or '.', exist_ok=True)
+            outputs = {service_date: bulletin_batch.output_path(args.output_dir or '.', service_date) for service_date in dates}
+        try:
+            bulletin_watch.watch(BulletinBuilder(auto_fit=args.auto_fit, strict_params=args.strict_params), outputs, args.watch_interval)
+        except ValueError as e:
+            print(e)
+            failed = dates
+    elif args.combine:
+        # One document, so rendering happens here rather than in worker processes
+        from bulletin_builder import BulletinBuilder
+        builder = BulletinBuilder(auto_fit=args.auto_fit, strict_params=args.strict_params)
+        ready = time.perf_counter()
+        bulletins = [data for service_date, data in iter_bulletin_data(dates, params_by_date=params_by_date)]
+        try:
+            size = builder.build_combined(bulletins, args.combine, args.stream_encoding)
+        except ValueError as e:
+            # With --strict-params one incomplete bulletin fails the whole document
+            print(e)
+            failed = dates
+        else:
+            print(f"Wrote {len(bulletins)} bulletins to {args.combine} ({size} bytes)")
+        if args.size_report and not failed:
+            separate = sum(len(builder.render(data.service_date, data=data)) for data in bulletins)
+            print(f"As separate PDFs: {separate} bytes; combining saved {separate - size} bytes ({(separate - size) / separate:.0%})")
+    elif len(dates) == 1 and args.output_dir is None:
+        # Fetch the bulletin's data on a thread while ReportLab is imported and the builder set up
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(BulletinData, dates[0], params=params_by_date.get(dates[0]))
+            from bulletin_builder import BulletinBuilder
+            builder = BulletinBuilder(auto_fit=args.auto_fit, strict_params=args.strict_params)
+            builder.logo()
+            ready = time.perf_counter()
+            try:
+                builder.build(dates[0], args.output, data=pending.result())
+            except ValueError as e:
+                print(e)
+                failed = dates
+    elif profiler is not None:
+        # Worker processes would be out of the profiler's sight
+        ready = time.perf_counter()
+        failed = bulletin_batch.build_serial(
+            dates,
+            output_dir=args.output_dir or '.',
+            builder_options={'auto_fit': args.auto_fit, 'strict_params': args.strict_params},
+            params_by_date=params_by_date)
+    else:
+        # ReportLab is loaded before the pool forks so workers inherit it
+        import bulletin_builder
+        ready = time.perf_counter()
+        failed = bulletin_batch.build_batch(
+            dates,
+            output_dir=args.output_dir or '.',
+            workers=args.workers,
+            max_tasks_per_worker=args.max_tasks_per_worker,
+            builder_options={'auto_fit': args.auto_fit, 'strict_params': args.strict_params},
+            params_by_date=params_by_date)
+    finished = time.perf_counter()
+
+    if profiler is not None:
+        profiler.stop()
+        print(profiler.report(args.profile_top), file=sys.stderr)
+        report_path, stacks_path = profiler.write(args.profile, args.profile_top)
+        print(f"Wrote {report_path} and {stacks_path}")
+
+    recorder = bulletin_metrics.recorder()
+    if recorder is not None:
+        if args.startup_time:
+            report_startup(ready, finished, recorder)
+        recorder.write_event(dict(recorder.summary(), event='summary'))
+        if args.metrics_file:
+            recorder.write_prometheus(args.metrics_file)
+        bulletin_metrics.disable()
+    return 1 if failed else 0
 
-# Create a custom Flowable to enclose the rectangle and table with bold text
-class RectWithTable(Flowable):
-    def __init__(self, width, height, data):
-        Flowable.__init__(self)
-        self.width = width
-        self.height = height
-        self.data = data
 
-    def draw(self):
-        self.canv.setStrokeColor(colors.black)
-        self.canv.rect(0, 0, self.width, self.height)
-
-        # Create a table with bold text
-        table = Table(self.data, colWidths=self.width)
-        table.setStyle(TableStyle([
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER')
-        ]))
-
-        # Draw the table inside the rectangle
-        table.wrapOn(self.canv, self.width, self.height)
-        table.drawOn(self.canv, 0, self.height - table._height)
-
-
-class BulletinBuilder():
-    def __init__(self):
-        # Define a custom ParagraphStyle for text formatting
-        #self.style_1 = ParagraphStyle(
-        #    name='Stylo',
-        #    fontName='Helvetica',
-        #    fontSize=10,
-        #    leading=12)
-        self.fontName = "Times-Roman"
-        self.style = {
-            'regular': ParagraphStyle(
-                name="Regular",
-                fontName=self.fontName
-            ),
-            'large': ParagraphStyle(
-                name="Large",
-                fontName=self.fontName,
-                fontSize=12,
-                leading=12
-            ),
-            'centered_large': ParagraphStyle(
-                name="CenteredLarge",
-                fontName=self.fontName,
-                fontSize=12,
-                leading=12,
-                alignment=1
-            ),
-            'xlarge': ParagraphStyle(
-                name="XLarge",
-                fontName=self.fontName,
-                fontSize=14,
-                leading=14
-            ),
-            'centered_xlarge': ParagraphStyle(
-                name="CenteredXLarge",
-                fontName=self.fontName,
-                fontSize=14,
-                leading=14,
-                alignment=1
-            ),
-            'centered': ParagraphStyle(
-                name="Centered",
-                fontName=self.fontName,
-                alignment=1
-            ),
-            'right': ParagraphStyle(
-                name="RightAligned",
-                fontName=self.fontName,
-                alignment=TA_RIGHT
-            ),
-            'bulletin_title': ParagraphStyle(
-                name='PilgrimTitle',
-                fontName=self.fontName,
-                fontSize=48,
-                leading=60,
-                alignment=1
-            ),
-            'bulletin_subtitle': ParagraphStyle(
-                name='PilgrimTitle2',
-                fontName=self.fontName,
-                fontSize=24,
-                leading=36,
-                alignment=1,
-            ),
-        }
-        
-        # Create a BaseDocTemplate for the PDF document
-        doc = BaseDocTemplate(
-            'bulletin.pdf',           # PDF file name
-            pagesize=landscape(LETTER),     # Landscape A4 page size
-            topMargin=bulletin_constants.TOP_MARGIN,           # Top margin of 1 inch
-            bottomMargin=bulletin_constants.BOTTOM_MARGIN,        # Bottom margin of 1 inch
-            leftMargin=bulletin_constants.LEFT_MARGIN,          # Left margin of 1 inch
-            rightMargin=bulletin_constants.RIGHT_MARGIN)         # Right margin of 1 inch
-
-        self.doc = doc
-
-        # Define the number of frames, width, and height for each frame
-        frameMargin = 50
-        frameCount = 2
-        frameWidth = (doc.width / frameCount) - frameMargin / frameCount
-        frameHeight = doc.height - 0.05*inch
-        self.frameWidth = frameWidth
-        self.frameHeight = frameHeight
-
-        # Create a list of frames
-        frame_list = [
-            Frame(
-                x1=doc.leftMargin,
-                y1=doc.bottomMargin,
-                width=frameWidth,
-                height=frameHeight),
-            Frame(
-                x1=doc.leftMargin + frameWidth + frameMargin,
-                y1=doc.bottomMargin,
-                width=frameWidth,
-                height=frameHeight),
-        ]
-
-        # Add the page template with the defined frames to the document
-        doc.addPageTemplates([PageTemplate(id='frames', frames=frame_list), ])
-
-        # Create a list to store the content (story) of the PDF
-        self.story = []
-
-    def hspace(self, points):
-        self.story.append(Spacer(0, points))
-
-    def build(self, service_date):
-        self.data = BulletinData(service_date)
-        # Print the back of the bulletin
-        self._print_back_page()
-
-        # Add a FrameBreak to jump to the next frame
-        self.story.append(FrameBreak())
-
-        # Print the front of the bulletin
-        self._print_front_page()
-
-        # Add a PageBreak to move to the logical inner side of the bulletin
-        self.story.append(PageBreak())
-
-        self._print_morning_worship()
-
-        self.story.append(FrameBreak())
-
-        self._print_evening_worship()
-
-        # Build the PDF document using the defined story
-        self.doc.build(self.story)
-
-    def _print_back_page(self):
-        # Add Welcome! Section
-        self._print_welcome()
-
-        # Add the custom element to the Story
-        self._print_announcements()
-
-        self.hspace(0.25 * inch)
-
-        # Add the serving schedule section
-        self._print_serving_schedule()
-
-    def _print_welcome(self):
-        welcome = [Paragraph("<b>WELCOME!</b>", self.style['centered']),Paragraph("<b>Welcome to the holy service of worship to the Triune God of Creation and Redemption. It is a great privilege to gather to worship the King of kings. If you are visiting with us, we warmly welcome you, and look forward to getting to know you better in our fellowship time after worship. May God’s high feast day be a delight to your soul as you commune with Him in worship!</b>", self.style['regular'])]
-        self.story.append(RectWithTable(self.frameWidth, self.frameHeight/6, [[element] for element in welcome]))
-
-    def _print_announcements(self):
-        announcements = [Paragraph("<b>ANNOUNCEMENTS</b>", self.style['centered'])] + [Paragraph(item, self.style['regular']) for item in self.data.params.get('announcements', [])]
-        # Create a custom RectWithTable element
-        self.story.append(RectWithTable(self.frameWidth, self.frameHeight/1.7, [[element] for element in announcements]))
-
-    def _print_serving_schedule(self):
-        headers = [Paragraph("<b><u>SERVING SCHEDULE</u></b>", self.style['regular']), Paragraph("<b>Today:</b>", self.style['regular']), Paragraph("<b>Next Week:</b>", self.style['regular'])]
-        snack_schedule = self.data.getSchedule('coffee_snack_schedule')
-        midweek_theme_schedule = self.data.getSchedule('midweek_theme_schedule')
-        data = [
-            headers,
-            [Paragraph("<b>Coffee Snack:</b>", self.style['regular']), Paragraph(snack_schedule[0], self.style['regular']), Paragraph(snack_schedule[1], self.style['regular'])],
-            [Paragraph("<b>Midweek Theme:</b>", self.style['regular']), Paragraph(midweek_theme_schedule[0], self.style['regular']), Paragraph(midweek_theme_schedule[1], self.style['regular'])]
-        ]
-        self.story.append(Table(
-            data=data,
-            style=[]
-        ))
-
-    def _print_front_page(self):
-        self._print_pilgrim_title()
-        self.hspace(0.25 * inch)
-        self._print_pilgrim_image()
-        self.hspace(0.25 * inch)
-        self._print_bottom_of_front_page()
-
-    def _print_pilgrim_title(self):
-        # Add text to the second frame
-        self.story.append(
-            Paragraph(
-                '<b>P I L G R I M</b>',
-                self.style['bulletin_title'],
-            )
-        )
-        self.story.append(
-            Paragraph(
-                "<b>PRESBYTERIAN CHURCH</b>",
-                self.style['bulletin_subtitle']
-            )
-        )
-        self.story.append(
-            Paragraph(
-                "<b><i>A Congregation of the Orthodox Presbyterian Church</i></b>",
-                self.style['centered']
-            )
-        )
-        self.story.append(
-            Paragraph(
-                "<b>Metamora, Michigan</b>",
-                self.style['centered_xlarge']
-            )
-        )
-
-    def _print_pilgrim_image(self):
-        # Add the PNG image to the PDF
-        img = utils.ImageReader('pilgrim.PNG')  # Replace 'example.png' with the path to your PNG file
-        img_width, img_height = img.getSize()
-        aspect_ratio = img_height / img_width
-        image = Image('pilgrim.PNG', width=self.frameWidth/1.2, height=self.frameWidth/1.2 * aspect_ratio)  # Adjust the width and height as needed
-        self.story.append(image)
-
-    def _print_bottom_of_front_page(self):
-        self.story.append(
-            Paragraph(
-                f"<b>THE LORD'S DAY<br/><i>{self.data.params.get('date')}</i></b>",
-                self.style['centered_xlarge']
-            )
-        )
-        
-        self.hspace(0.15 * inch)
-
-        self.story.append(
-            Paragraph(
-                "<b>MORNING WORSHIP — 11:00 AM / EVENING WORSHIP — 6:00 PM</b>",
-                self.style['centered']
-            )
-        )
-
-        self.hspace(0.15 * inch)
-
-        self.story.append(
-            Paragraph(
-                "<b><i>“Blessed is the people that know the joyful sound: They shall walk, O Lord, in the light of your countenance. In Your name shall they rejoice all the day; and in your righteousness they shall be exalted.”</i><br/>Psalm 89:15-16 — Inscribed on the church bell in 1878.</b>",
-                self.style['centered']
-            )
-        )
-    
-    def _print_morning_worship(self):
-        self.story.append(Paragraph(
-            "<b>MORNING WORSHIP</b>",
-            self.style['centered_xlarge']
-        ))
-        self.hspace(0.1 * inch)
-
-        self._print_leading_elders()
-
-        self.hspace(0.2 * inch)
-
-        self._print_order_of_worship("morning")
-    
-    def _print_leading_elders(self):
-        data = [
-            [Paragraph("<b>Leading in Worship:</b>", self.style['centered']), Paragraph("<b>Preaching:</b>", self.style['centered'])],
-            [Paragraph(self.data.params.get('leading_in_worship', ""), self.style['centered']), Paragraph(self.data.params.get('preaching', ""), self.style['centered'])]
-        ]
-
-        self.story.append(Table(
-            data,
-            colWidths=120,
-            style=[
-                ('ALIGN', (0, 0), (-1,-1), 'CENTER')
-            ]
-        ))
-
-    def _print_order_of_worship(self, service):
-        oow = self.data.generate_oow(service)
-        for section in oow.get('sections', []):
-            self._print_oow_section(section['title'], section['content'])
-        self.story.append(Paragraph(
-            oow.get('benediction_song', ""),
-            self.style['xlarge']
-        ))
-        if service == 'morning':
-            self.story.append(Paragraph(
-                "<i>* Congregation standing</i>",
-                self.style['right']
-            ))
-
-
-    def _print_oow_section(self, title, content):
-        # How to indent and some have bullets and some don't?
-        # Maybe use a table
-
-        self.story.append(Paragraph(
-            f"<b>{title}</b>",
-            self.style['large']
-        ))
-
-        self.story.append(Table(
-            data=[[("*" if 'footnote' in line else ''), Paragraph(line['text'], self.style['large'])] for line in content],
-            colWidths=(0.10 * inch, self.frameWidth - 0.10 * inch),
-            style=[
-                ('LEFTPADDING', (1,0), (1, -1), 0.5 * inch)
-            ]
-        ))
-
-    def _print_evening_worship(self):
-        self.story.append(Paragraph(
-            "<b>EVENING WORSHIP</b>",
-            self.style['centered_xlarge']
-        ))
-
-        self.hspace(0.2 * inch)
-
-        self._print_order_of_worship("evening")
-
-        self.hspace(0.2 * inch)
-
-        self._print_congregational_confession()
-
-    def _print_congregational_confession(self):
-        data = [
-            [Paragraph(f"<b>{self.data.params.get('corporate_confession_title', '')}</b>", self.style['centered_large'])],
-            [Paragraph(self.data.params.get('corporate_confession_text', ""), self.style['large'])]
-        ]
-        self.story.append(RectWithTable(self.frameWidth, self.frameHeight/3.3, data))
-
-
-        
-
-
-
-# Check if this script is the main module
 if __name__ == "__main__":
-    builder = BulletinBuilder()
-    builder.build('2023-08-20')
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import threading
+
+import bulletin_metrics
+import bulletin_files
+
+DEFAULT_ASSET_DIR = os.path.join('.bulletin-cache', 'assets')
+# Resolution the bulletin is printed at; logos are never scaled above their source size
+DEFAULT_DPI = 200
+# JPEG is embedded in the PDF as-is; PNG is lossless but decoded and re-compressed every build
+DEFAULT_FORMAT = 'JPEG'
+# Bump when the preparation below changes so old cached files are not reused
+PIPELINE_VERSION = 1
+
+
+class PreparedImage():
+    def __init__(self, path, pixel_width, pixel_height):
+        self.path = path
+        self.pixel_width = pixel_width
+        self.pixel_height = pixel_height
+
+    @property
+    def aspect_ratio(self):
+        return self.pixel_height / self.pixel_width
+
+
+class AssetCache():
+    # Resizes and flattens images once for a given print size and keeps the result on disk
+    def __init__(self, directory=DEFAULT_ASSET_DIR, dpi=DEFAULT_DPI, background=(255, 255, 255), image_format=DEFAULT_FORMAT):
+        self.directory = directory
+        self.dpi = dpi
+        self.background = background
+        self.image_format = image_format
+        self.prepared = {}
+        self.lock = threading.Lock()
+
+    def _cache_key(self, source, width_points):
+        with open(source, 'rb') as f:
+            digest = hashlib.sha1(f.read())
+        digest.update(json.dumps([PIPELINE_VERSION, round(width_points, 2), self.dpi, self.background, self.image_format]).encode('utf-8'))
+        return digest.hexdigest()
+
+    def prepare(self, source, width_points):
+        # Memoized per process; the source is only re-read when the file changes
+        stat = os.stat(source)
+        memo_key = (os.path.abspath(source), stat.st_mtime_ns, stat.st_size, width_points)
+        with self.lock:
+            prepared = self.prepared.get(memo_key)
+            if prepared is None:
+                prepared = self._prepare(source, width_points)
+                self.prepared[memo_key] = prepared
+            return prepared
+
+    @bulletin_metrics.timed('prepare_image')
+    def _prepare(self, source, width_points):
+        key = self._cache_key(source, width_points)
+        extension = 'jpg' if self.image_format == 'JPEG' else 'png'
+        path = os.path.join(self.directory, f"{key}.{extension}")
+        meta_path = os.path.join(self.directory, f"{key}.json")
+        if os.path.exists(path) and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            return PreparedImage(path, meta['width'], meta['height'])
+
+        # Only a cache miss needs Pillow
+        from PIL import Image as PILImage
+        image = PILImage.open(source)
+        image.load()
+        target_width = min(image.width, round(width_points / 72 * self.dpi))
+        if target_width < image.width:
+            target_height = round(image.height * target_width / image.width)
+            image = image.resize((target_width, target_height), PILImage.LANCZOS)
+        # Flatten transparency onto the paper colour so no soft mask is embedded
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            image = image.convert('RGBA')
+            flattened = PILImage.new('RGB', image.size, self.background)
+            flattened.paste(image, mask=image.getchannel('A'))
+            image = flattened
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary name first so concurrent builds never read half a file
+        with bulletin_files.atomic_write(path) as f:
+            if self.image_format == 'JPEG':
+                image.save(f, 'JPEG', quality=92, dpi=(self.dpi, self.dpi))
+            else:
+                image.save(f, 'PNG', optimize=True, dpi=(self.dpi, self.dpi))
+        with bulletin_files.atomic_write(meta_path, 'w') as f:
+            json.dump({'width': image.width, 'height': image.height, 'source': source}, f)
+        return PreparedImage(path, image.width, image.height)
+
+
+_default_assets = None
+
+
+def configure(directory=DEFAULT_ASSET_DIR, dpi=DEFAULT_DPI, image_format=DEFAULT_FORMAT):
+    global _default_assets
+    _default_assets = AssetCache(directory, dpi=dpi, image_format=image_format)
+    return _default_assets
+
+
+def default_assets():
+    if _default_assets is None:
+        configure()
+    return _default_assets
@@ -0,0 +1,87 @@
+import threading
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import Paragraph
+
+# Table cell padding RectWithTable gets from ReportLab's defaults
+CELL_PADDING_X = 6
+CELL_PADDING_Y = 3
+# Smallest font size a box will shrink its text to
+MIN_FONT_SIZE = 7
+# Font sizes are tried in steps of this many points
+FONT_SIZE_STEP = 0.25
+
+
+class AutoFit():
+    # Shrinks the text of a fixed-height box until it fits, measuring with wrap() only
+    def __init__(self, min_font_size=MIN_FONT_SIZE, step=FONT_SIZE_STEP):
+        self.min_font_size = min_font_size
+        self.step = step
+        self.heights = {}
+        self.styles = {}
+        self.lock = threading.Lock()
+
+    def scaled_style(self, style, font_size):
+        # The style at a smaller size, keeping its leading in proportion
+        if font_size == style.fontSize:
+            return style
+        key = (style.name, font_size)
+        with self.lock:
+            scaled = self.styles.get(key)
+            if scaled is None:
+                scaled = ParagraphStyle(
+                    name=f"{style.name}@{font_size}",
+                    parent=style,
+                    fontSize=font_size,
+                    leading=style.leading * font_size / style.fontSize)
+                self.styles[key] = scaled
+        return scaled
+
+    def paragraph_height(self, markup, style, width):
+        key = (markup, style.fontName, style.fontSize, style.leading, style.alignment, width)
+        with self.lock:
+            height = self.heights.get(key)
+        if height is None:
+            height = Paragraph(markup, style).wrap(width, 1e6)[1]
+            with self.lock:
+                self.heights[key] = height
+        return height
+
+    def table_height(self, rows, width):
+        # Height of a one-column Table of paragraphs, as ReportLab lays it out
+        cell_width = width - 2 * CELL_PADDING_X
+        return sum(self.paragraph_height(markup, style, cell_width) + 2 * CELL_PADDING_Y for markup, style in rows)
+
+    def fit(self, header, body, width, height):
+        # header and body are lists of (markup, style); only the body shrinks.
+        # Returns the body rows with the largest styles that fit, or the smallest allowed.
+        def rows_at(steps_down):
+            return [(markup, self.scaled_style(style, max(style.fontSize - steps_down * self.step, self.min_font_size)))
+                    for markup, style in body]
+
+        def fits(steps_down):
+            return self.table_height(header + rows_at(steps_down), width) <= height
+
+        if fits(0):
+            return body
+        largest = max((style.fontSize for markup, style in body), default=self.min_font_size)
+        low, high = 1, max(1, int((largest - self.min_font_size) / self.step))
+        # Binary search for the fewest steps down that fit
+        while low < high:
+            middle = (low + high) // 2
+            if fits(middle):
+                high = middle
+            else:
+                low = middle + 1
+        if not fits(low):
+            print(f"Text does not fit in its box even at {self.min_font_size}pt")
+        return rows_at(low)
+
+
+_default_autofit = None
+
+
+def default_autofit():
+    global _default_autofit
+    if _default_autofit is None:
+        _default_autofit = AutoFit()
+    return _default_autofit
@@ -0,0 +1,367 @@
+import argparse
+import copy
+import json
+import os
+import threading
+import time
+from decimal import Decimal
+from urllib.parse import quote, unquote
+
+import bulletin_metrics
+import bulletin_files
+
+# DynamoDB accepts at most 100 keys per BatchGetItem request
+BATCH_GET_LIMIT = 100
+BATCH_GET_MAX_RETRIES = 5
+# Tables keyed by an ISO date also carry the date's year, and a global secondary index
+# on (year, date) lets a date range be read with one Query per year instead of a Scan
+YEAR_INDEX = 'ServiceYearIndex'
+YEAR_ATTRIBUTE = 'service_year'
+
+# Where DynamoDB is and how connections to it behave; see DynamoDBConnections
+DEFAULT_REGION = 'us-east-1'
+DEFAULT_ENDPOINT = 'http://localhost:8000'
+DEFAULT_MAX_POOL_CONNECTIONS = 16
+DEFAULT_CONNECT_TIMEOUT = 2
+DEFAULT_READ_TIMEOUT = 10
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+class DynamoDBConnections():
+    # One boto3 session and client per process, shared by every thread: clients are
+    # thread-safe and keep a pool of HTTP connections, so credentials, endpoint set-up and
+    # connecting happen once rather than per bulletin. Resources are not thread-safe, so
+    # each thread gets its own, wrapped around the shared client. A forked child starts
+    # over instead of sharing the parent's sockets.
+    def __init__(self, region_name=DEFAULT_REGION, endpoint_url=DEFAULT_ENDPOINT, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 retry_mode='adaptive', tcp_keepalive=True):
+        self.region_name = region_name
+        self.endpoint_url = endpoint_url
+        self.max_pool_connections = max_pool_connections
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_attempts = max_attempts
+        self.retry_mode = retry_mode
+        self.tcp_keepalive = tcp_keepalive
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self._resource = None
+        self._local = threading.local()
+
+    def config(self):
+        from botocore.config import Config
+        return Config(
+            max_pool_connections=self.max_pool_connections,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            retries={'max_attempts': self.max_attempts, 'mode': self.retry_mode},
+            tcp_keepalive=self.tcp_keepalive,
+        )
+
+    # boto3 takes longer to import than a cached build takes to fetch its data,
+    # so it is imported on first use rather than at the top of the module
+    def _connect(self):
+        if self.pid != os.getpid():
+            self._reset()
+        with self.lock:
+            if self._resource is None:
+                import boto3
+                session = boto3.session.Session(region_name=self.region_name)
+                self._resource = session.resource('dynamodb', endpoint_url=self.endpoint_url, config=self.config())
+            return self._resource
+
+    def client(self):
+        return self._connect().meta.client
+
+    def resource(self):
+        # This thread's resource; every one of them shares the process's client
+        shared = self._connect()
+        dynamodb = getattr(self._local, 'dynamodb', None)
+        if dynamodb is None:
+            dynamodb = type(shared)(client=shared.meta.client)
+            self._local.dynamodb = dynamodb
+        return dynamodb
+
+
+_default_connections = None
+
+
+def configure_connections(**settings):
+    global _default_connections
+    _default_connections = DynamoDBConnections(**settings)
+    return _default_connections
+
+
+def default_connections():
+    if _default_connections is None:
+        configure_connections()
+    return _default_connections
+
+
+def connect_dynamodb():
+    # A DynamoDB resource for this thread from the process's shared connections
+    return default_connections().resource()
+
+def projection(key_name, attributes):
+    # Request parameters that limit items to the given attributes (the key is always included).
+    # Names go through placeholders since params such as 'date' are DynamoDB reserved words.
+    if attributes is None:
+        return {}
+    names = [key_name] + sorted(name for name in attributes if name != key_name)
+    return {
+        'ProjectionExpression': ', '.join(f"#a{i}" for i in range(len(names))),
+        'ExpressionAttributeNames': {f"#a{i}": name for i, name in enumerate(names)},
+    }
+
+def project(item, key_name, attributes):
+    # The same projection applied to an item already in hand
+    if item is None or attributes is None:
+        return item
+    return {name: value for name, value in item.items() if name == key_name or name in attributes}
+
+@bulletin_metrics.timed('batch_get_items')
+def batch_get_items(dynamodb, table_name, key_name, key_values, attributes=None):
+    # Fetch many items from one table, retrying unprocessed keys with backoff.
+    # attributes limits the items to those attributes (the key is always included).
+    from botocore.exceptions import ClientError
+    items = {}
+    key_values = list(dict.fromkeys(key_values))
+    for start in range(0, len(key_values), BATCH_GET_LIMIT):
+        chunk = key_values[start:start + BATCH_GET_LIMIT]
+        request = {table_name: dict({'Keys': [{key_name: value} for value in chunk]}, **projection(key_name, attributes))}
+        attempt = 0
+        while request:
+            try:
+                response = dynamodb.batch_get_item(RequestItems=request)
+            except ClientError as e:
+                print(f"Error retrieving items: {e.response['Error']['Message']}")
+                break
+            for item in response.get('Responses', {}).get(table_name, []):
+                items[item[key_name]] = item
+            request = response.get('UnprocessedKeys') or {}
+            if request:
+                attempt += 1
+                if attempt > BATCH_GET_MAX_RETRIES:
+                    print(f"Giving up on {len(request[table_name]['Keys'])} unprocessed keys from {table_name}")
+                    break
+                time.sleep(0.05 * 2 ** attempt)
+    return items
+
+
+def service_year(service_date):
+    return str(service_date)[:4]
+
+@bulletin_metrics.timed('query_range')
+def query_range(dynamodb, table_name, key_name, start, end):
+    # Items keyed between two ISO dates inclusive, read from the year index a page at a time
+    from boto3.dynamodb.conditions import Key
+    from botocore.exceptions import ClientError
+    table = dynamodb.Table(table_name)
+    items = {}
+    for year in range(int(service_year(start)), int(service_year(end)) + 1):
+        query = {
+            'IndexName': YEAR_INDEX,
+            'KeyConditionExpression': Key(YEAR_ATTRIBUTE).eq(str(year)) & Key(key_name).between(start, end),
+        }
+        while True:
+            try:
+                response = table.query(**query)
+            except ClientError as e:
+                print(f"Error querying {table_name}: {e.response['Error']['Message']}")
+                return items
+            for item in response.get('Items', []):
+                items[item[key_name]] = item
+            if 'LastEvaluatedKey' not in response:
+                break
+            query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return items
+
+
+# Every backend answers get_item with the item or None, get_items with a dict of the
+# items it found keyed by key value (missing items are simply left out), and get_range
+# with the items whose keys fall between start and end inclusive, in key order.
+# get_item and get_items can be limited to some attributes, as with a ProjectionExpression.
+
+class DynamoDBBackend():
+    # Reads through a resource passed in, or else through the given or process-wide
+    # connections, which hand each thread (see iter_bulletin_data) its own resource
+    def __init__(self, dynamodb=None, connections=None):
+        self._dynamodb = dynamodb
+        self._connections = connections
+
+    @property
+    def dynamodb(self):
+        if self._dynamodb is not None:
+            return self._dynamodb
+        return (self._connections or default_connections()).resource()
+
+    def get_item(self, table_name, key_name, key, attributes=None):
+        from botocore.exceptions import ClientError
+        try:
+            response = self.dynamodb.Table(table_name).get_item(Key={key_name: key}, **projection(key_name, attributes))
+        except ClientError as e:
+            print(f"Error retrieving item: {e.response['Error']['Message']}")
+            return None
+        return response.get('Item') or None
+
+    def get_items(self, table_name, key_name, keys, attributes=None):
+        return batch_get_items(self.dynamodb, table_name, key_name, keys, attributes)
+
+    def get_range(self, table_name, key_name, start, end):
+        return query_range(self.dynamodb, table_name, key_name, start, end)
+
+
+def _json_default(value):
+    # DynamoDB numbers and sets, for items exported to files
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    raise TypeError(f"Cannot store {type(value).__name__} in a JSON item")
+
+
+class FileBackend():
+    # A directory per table holding one JSON file per item, e.g. BulletinParams/2023-08-20.json
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, table_name, key):
+        return os.path.join(self.directory, table_name, f"{quote(str(key), safe='')}.json")
+
+    def get_item(self, table_name, key_name, key, attributes=None):
+        try:
+            with open(self._path(table_name, key), encoding='utf-8') as f:
+                return project(json.load(f), key_name, attributes)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            print(f"Error reading {self._path(table_name, key)}: {e}")
+            return None
+
+    def get_items(self, table_name, key_name, keys, attributes=None):
+        items = {}
+        for key in dict.fromkeys(keys):
+            item = self.get_item(table_name, key_name, key, attributes)
+            if item is not None:
+                items[key] = item
+        return items
+
+    def get_range(self, table_name, key_name, start, end):
+        try:
+            names = os.listdir(os.path.join(self.directory, table_name))
+        except FileNotFoundError:
+            return {}
+        keys = sorted(unquote(name[:-len('.json')]) for name in names if name.endswith('.json'))
+        return self.get_items(table_name, key_name, [key for key in keys if start <= key <= end])
+
+    def put_item(self, table_name, key_name, item):
+        path = self._path(table_name, item[key_name])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with bulletin_files.atomic_write(path, 'w', encoding='utf-8') as f:
+            json.dump(item, f, indent=2, ensure_ascii=False, default=_json_default)
+
+
+class MemoryBackend():
+    # Items held in a dict of {table_name: {key: item}}; callers get copies, as from DynamoDB
+    def __init__(self, tables=None):
+        self.tables = tables if tables is not None else {}
+
+    def get_item(self, table_name, key_name, key, attributes=None):
+        item = self.tables.get(table_name, {}).get(key)
+        return copy.deepcopy(project(item, key_name, attributes))
+
+    def get_items(self, table_name, key_name, keys, attributes=None):
+        table = self.tables.get(table_name, {})
+        return {key: copy.deepcopy(project(table[key], key_name, attributes)) for key in dict.fromkeys(keys) if key in table}
+
+    def get_range(self, table_name, key_name, start, end):
+        table = self.tables.get(table_name, {})
+        return self.get_items(table_name, key_name, sorted(key for key in table if start <= key <= end))
+
+    def put_item(self, table_name, key_name, item):
+        self.tables.setdefault(table_name, {})[item[key_name]] = copy.deepcopy(item)
+
+
+class CachedBackend():
+    # Serves what it can from an ItemCache and fetches only the misses from the wrapped backend.
+    # An offline cache never reaches the wrapped backend.
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+
+    # Whole items are fetched and cached even when only some attributes are asked for, so
+    # the cache never serves a partial item; the local copy makes the projection moot anyway
+
+    def get_item(self, table_name, key_name, key, attributes=None):
+        return self.get_items(table_name, key_name, [key]).get(key)
+
+    def get_items(self, table_name, key_name, keys, attributes=None):
+        keys = list(dict.fromkeys(keys))
+        items = self.cache.get_many(table_name, keys)
+        missing = [key for key in keys if key not in items]
+        if not missing:
+            return items
+        if self.cache.offline:
+            print(f"Offline: {len(missing)} items from {table_name} are not cached")
+            return items
+        if len(missing) == 1:
+            item = self.backend.get_item(table_name, key_name, missing[0])
+            fetched = {missing[0]: item} if item is not None else {}
+        else:
+            fetched = self.backend.get_items(table_name, key_name, missing)
+        self.cache.put_many(table_name, fetched)
+        items.update(fetched)
+        return items
+
+    def get_range(self, table_name, key_name, start, end):
+        # Only the data source knows which keys exist, so ranges always go to it unless offline
+        if self.cache.offline:
+            return self.cache.get_range(table_name, start, end)
+        items = self.backend.get_range(table_name, key_name, start, end)
+        self.cache.put_many(table_name, items)
+        return items
+
+
+_default_backend = None
+
+
+def configure(backend):
+    global _default_backend
+    _default_backend = backend
+    return _default_backend
+
+
+def default_backend():
+    if _default_backend is None:
+        configure(DynamoDBBackend())
+    return _default_backend
+
+
+def export_tables(backend, directory, tables):
+    # Copy every item of the given {table_name: key_name} tables into a FileBackend directory
+    files = FileBackend(directory)
+    count = 0
+    for table_name, key_name in tables.items():
+        scan = backend.dynamodb.Table(table_name).scan
+        response = scan()
+        while True:
+            for item in response.get('Items', []):
+                files.put_item(table_name, key_name, item)
+                count += 1
+            if 'LastEvaluatedKey' not in response:
+                break
+            response = scan(ExclusiveStartKey=response['LastEvaluatedKey'])
+    return count
+
+
+if __name__ == "__main__":
+    from bulletin_data import KEY_NAMES
+
+    parser = argparse.ArgumentParser(description="Copy the bulletin tables from DynamoDB into a directory of JSON files.")
+    parser.add_argument('directory', help="Directory to write, usable with build-bulletin.py --data-dir")
+    args = parser.parse_args()
+    print(f"Exported {export_tables(DynamoDBBackend(), args.directory, KEY_NAMES)} items to {args.directory}")
@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+from datetime import date, timedelta
+
+import bulletin_metrics
+from bulletin_data import BulletinData, iter_bulletin_data
+
+# Recycle each worker after this many bulletins so memory stays bounded
+DEFAULT_MAX_TASKS_PER_WORKER = 12
+
+# Warm state kept by each pool worker between the dates it renders. Data comes from the
+# default backend, which workers inherit and which only connects once a task needs it.
+_builder = None
+
+
+def service_dates(start, end, step=7):
+    # Every `step` days from start through end, inclusive (weekly by default)
+    current = date.fromisoformat(start)
+    last = date.fromisoformat(end)
+    dates = []
+    while current <= last:
+        dates.append(current.isoformat())
+        current += timedelta(days=step)
+    return dates
+
+
+def output_path(output_dir, service_date):
+    return os.path.join(output_dir, f"bulletin-{service_date}.pdf")
+
+
+def _init_worker(builder_options):
+    global _builder
+    # Forked workers inherit whatever the parent had recorded; start from zero
+    recorder = bulletin_metrics.recorder()
+    if recorder is not None:
+        recorder.drain()
+    with bulletin_metrics.span('worker_init'):
+        from bulletin_builder import BulletinBuilder
+        _builder = BulletinBuilder(**builder_options)
+
+
+def _build_one(job):
+    service_date, filename, params, oows = job
+    error = None
+    try:
+        data = BulletinData(service_date, params=params, oows=oows)
+        _builder.build(service_date, filename, data=data)
+    except Exception as e:
+        error = str(e)
+    # Metrics recorded in the worker travel back with the result
+    recorder = bulletin_metrics.recorder()
+    return service_date, filename, error, recorder.drain() if recorder is not None else None
+
+
+def render_pdf(service_date):
+    # Render to memory for callers that serve the bytes; None if the date has no bulletin
+    data = BulletinData(service_date)
+    if not data.params:
+        return None
+    return _builder.render(service_date, data=data)
+
+
+def start_pool(workers=None, max_tasks_per_worker=DEFAULT_MAX_TASKS_PER_WORKER, builder_options=None):
+    # Worker processes that each keep a warm builder between tasks. ReportLab is loaded
+    # here, before forking, so workers inherit it instead of each importing it again.
+    import bulletin_builder
+    return multiprocessing.Pool(
+        workers, initializer=_init_worker, initargs=(builder_options or {},), maxtasksperchild=max_tasks_per_worker)
+
+
+def build_batch(dates, output_dir='.', workers=None, max_tasks_per_worker=DEFAULT_MAX_TASKS_PER_WORKER, builder_options=None, params_by_date=None):
+    os.makedirs(output_dir, exist_ok=True)
+    # Duplicate dates would have two workers writing the same file
+    dates = list(dict.fromkeys(dates))
+    # Inputs are fetched in batched requests a chunk of dates at a time, so workers start
+    # rendering the first dates while later ones are still being fetched. The pool drains
+    # this generator on its own thread; workers only render.
+    jobs = (
+        (service_date, output_path(output_dir, service_date), data.params, data.oows)
+        for service_date, data in iter_bulletin_data(dates, params_by_date=params_by_date)
+    )
+    failed = []
+    # Fork the workers before any fetching thread is running
+    with start_pool(workers, max_tasks_per_worker, builder_options) as pool:
+        for service_date, filename, error, metrics in pool.imap_unordered(_build_one, jobs):
+            if metrics is not None:
+                bulletin_metrics.recorder().merge(metrics)
+            if error is None:
+                print(f"Built {filename}")
+            else:
+                print(f"Error building bulletin for {service_date}: {error}")
+                failed.append(service_date)
+    return failed
+
+
+def build_serial(dates, output_dir='.', builder_options=None, params_by_date=None):
+    # The same build in this process, one date after another, e.g. so a profiler sees the rendering
+    from bulletin_builder import BulletinBuilder
+    os.makedirs(output_dir, exist_ok=True)
+    builder = BulletinBuilder(**(builder_options or {}))
+    failed = []
+    for service_date, data in iter_bulletin_data(dates, params_by_date=params_by_date):
+        filename = output_path(output_dir, service_date)
+        try:
+            builder.build(service_date, filename, data=data)
+        except Exception as e:
+            print(f"Error building bulletin for {service_date}: {e}")
+            failed.append(service_date)
+        else:
+            print(f"Built {filename}")
+    return failed
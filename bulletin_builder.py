@@ -0,0 +1,573 @@
+import io
+from contextlib import contextmanager
+
+# Import necessary modules from ReportLab
+from reportlab.lib.pagesizes import LETTER, landscape
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from reportlab import rl_config
+from reportlab.graphics.shapes import Rect, Drawing
+from reportlab.platypus import (
+    BaseDocTemplate, PageTemplate, PageBreak, Frame, FrameBreak, Spacer, Table, TableStyle, Image
+)
+from reportlab.platypus.flowables import DocIf, Flowable
+from reportlab.lib.enums import TA_RIGHT
+
+# CUSTOM CODE
+from bulletin_data import BulletinData
+import bulletin_assets
+import bulletin_autofit
+import bulletin_constants
+import bulletin_metrics
+import bulletin_paragraphs
+import bulletin_render_cache
+import bulletin_static
+
+# How page content and images are stored: ReportLab's default of deflate plus ASCII85,
+# deflate alone (binary streams, a quarter smaller than ASCII85 text), or uncompressed
+STREAM_ENCODINGS = ('ascii85', 'binary', 'none')
+
+
+@contextmanager
+def stream_encoding(encoding):
+    # ASCII85 is a process-wide ReportLab setting, so it is only changed for the one build
+    use_a85 = rl_config.useA85
+    rl_config.useA85 = 1 if encoding == 'ascii85' else 0
+    try:
+        yield {'pageCompression': 0 if encoding == 'none' else 1}
+    finally:
+        rl_config.useA85 = use_a85
+
+
+# Create a custom Flowable to enclose the rectangle and table with bold text
+class RectWithTable(Flowable):
+    # height is the minimum height of the box; it grows to hold its table and splits across frames
+    def __init__(self, width, height, data, table=None):
+        Flowable.__init__(self)
+        self.width = width
+        self.height = height
+        self.minHeight = height
+        self.data = data
+        self._table = table
+        self._tableHeight = None
+
+    def _get_table(self):
+        # Create a table with bold text, once. Splits fall between rows where they can, and
+        # inside a row otherwise, as most boxes hold a single long paragraph.
+        if self._table is None:
+            self._table = Table(self.data, colWidths=self.width, splitInRow=1)
+            self._table.setStyle(TableStyle([
+                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER')
+            ]))
+        return self._table
+
+    def wrap(self, availWidth, availHeight):
+        # Measure the table on the first wrap and reuse the result for every later wrap and draw
+        if self._tableHeight is None:
+            self._tableHeight = self._get_table().wrapOn(getattr(self, 'canv', None), self.width, availHeight)[1]
+        self.height = max(self.minHeight, self._tableHeight)
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        # Split the table; the first part fills the rest of the frame
+        self.wrap(availWidth, availHeight)
+        if self.height <= availHeight:
+            return [self]
+        parts = self._get_table().splitOn(getattr(self, 'canv', None), self.width, availHeight)
+        if len(parts) < 2:
+            return []
+        first, rest = parts[0], parts[1]
+        return [
+            RectWithTable(self.width, availHeight, None, table=first),
+            RectWithTable(self.width, max(self.minHeight - availHeight, 0), None, table=rest),
+        ]
+
+    def draw(self):
+        self.canv.setStrokeColor(colors.black)
+        self.canv.rect(0, 0, self.width, self.height)
+
+        # Draw the table inside the rectangle
+        table = self._get_table()
+        table.drawOn(self.canv, 0, self.height - self._tableHeight)
+
+
+class BulletinBuilder():
+    def __init__(self, filename='bulletin.pdf', auto_fit=False, strict_params=False):
+        # Define a custom ParagraphStyle for text formatting
+        #self.style_1 = ParagraphStyle(
+        #    name='Stylo',
+        #    fontName='Helvetica',
+        #    fontSize=10,
+        #    leading=12)
+        self.fontName = "Times-Roman"
+        self.style = {
+            'regular': ParagraphStyle(
+                name="Regular",
+                fontName=self.fontName
+            ),
+            'large': ParagraphStyle(
+                name="Large",
+                fontName=self.fontName,
+                fontSize=12,
+                leading=12
+            ),
+            'centered_large': ParagraphStyle(
+                name="CenteredLarge",
+                fontName=self.fontName,
+                fontSize=12,
+                leading=12,
+                alignment=1
+            ),
+            'xlarge': ParagraphStyle(
+                name="XLarge",
+                fontName=self.fontName,
+                fontSize=14,
+                leading=14
+            ),
+            'centered_xlarge': ParagraphStyle(
+                name="CenteredXLarge",
+                fontName=self.fontName,
+                fontSize=14,
+                leading=14,
+                alignment=1
+            ),
+            'centered': ParagraphStyle(
+                name="Centered",
+                fontName=self.fontName,
+                alignment=1
+            ),
+            'right': ParagraphStyle(
+                name="RightAligned",
+                fontName=self.fontName,
+                alignment=TA_RIGHT
+            ),
+            'bulletin_title': ParagraphStyle(
+                name='PilgrimTitle',
+                fontName=self.fontName,
+                fontSize=48,
+                leading=60,
+                alignment=1
+            ),
+            'bulletin_subtitle': ParagraphStyle(
+                name='PilgrimTitle2',
+                fontName=self.fontName,
+                fontSize=24,
+                leading=36,
+                alignment=1,
+            ),
+        }
+        
+        # Everything above and below is shared, read-only setup; the story and document
+        # for each bulletin live in a BulletinRender, so one builder can render many
+        self.filename = filename
+        # Shrink text in fixed-height boxes until it fits instead of overflowing the border
+        self.auto_fit = auto_fit
+        # Refuse to lay out a bulletin whose orders of worship use params it does not have
+        self.strict_params = strict_params
+
+        # Options for the BaseDocTemplate created for each PDF document
+        self.doc_options = dict(
+            pagesize=landscape(LETTER),     # Landscape A4 page size
+            topMargin=bulletin_constants.TOP_MARGIN,           # Top margin of 1 inch
+            bottomMargin=bulletin_constants.BOTTOM_MARGIN,        # Bottom margin of 1 inch
+            leftMargin=bulletin_constants.LEFT_MARGIN,          # Left margin of 1 inch
+            rightMargin=bulletin_constants.RIGHT_MARGIN)         # Right margin of 1 inch
+        docWidth = self.doc_options['pagesize'][0] - bulletin_constants.LEFT_MARGIN - bulletin_constants.RIGHT_MARGIN
+        docHeight = self.doc_options['pagesize'][1] - bulletin_constants.TOP_MARGIN - bulletin_constants.BOTTOM_MARGIN
+
+        # Define the number of frames, width, and height for each frame
+        frameMargin = 50
+        frameCount = 2
+        frameWidth = (docWidth / frameCount) - frameMargin / frameCount
+        frameHeight = docHeight - 0.05*inch
+        self.frameWidth = frameWidth
+        self.frameHeight = frameHeight
+
+        # Lower-left corner of each frame
+        self.frame_origins = (
+            (bulletin_constants.LEFT_MARGIN, bulletin_constants.BOTTOM_MARGIN),
+            (bulletin_constants.LEFT_MARGIN + frameWidth + frameMargin, bulletin_constants.BOTTOM_MARGIN),
+        )
+
+    def new_doc(self, output, **options):
+        # Documents and frames hold layout state while building, so each render gets its own
+        doc = BaseDocTemplate(output, **dict(self.doc_options, **options))
+
+        # Create a list of frames
+        frame_list = [
+            Frame(
+                x1=x1,
+                y1=y1,
+                width=self.frameWidth,
+                height=self.frameHeight)
+            for x1, y1 in self.frame_origins
+        ]
+
+        # Add the page template with the defined frames to the document
+        doc.addPageTemplates([PageTemplate(id='frames', frames=frame_list), ])
+        return doc
+
+    @bulletin_metrics.timed('build')
+    def build(self, service_date, output=None, dynamodb=None, data=None):
+        # output is a file name or any writable binary stream such as a BytesIO
+        if output is None:
+            output = self.filename
+        # Callers that prefetched in bulk pass the data in; otherwise fetch it now
+        data = data or BulletinData(service_date, dynamodb=dynamodb)
+        self.check_params(data)
+
+        # The PDF depends only on the fetched items, the logo, and the code version
+        render_cache = bulletin_render_cache.default_render_cache()
+        pdf = None
+        if render_cache is not None:
+            key = bulletin_render_cache.render_key(data.output_params(), data.oows, self.logo().path, self.options())
+            pdf = render_cache.get(service_date, key)
+        if pdf is None:
+            buffer = io.BytesIO()
+            BulletinRender(self, data).build(buffer)
+            pdf = buffer.getvalue()
+            if render_cache is not None:
+                render_cache.put(service_date, key, pdf)
+        bulletin_metrics.increment('bulletins')
+        bulletin_metrics.increment('pdf_bytes', len(pdf))
+        if hasattr(output, 'write'):
+            output.write(pdf)
+        else:
+            with open(output, 'wb') as f:
+                f.write(pdf)
+
+    def render(self, service_date, dynamodb=None, data=None):
+        # Build into memory and return the PDF bytes
+        buffer = io.BytesIO()
+        self.build(service_date, buffer, dynamodb=dynamodb, data=data)
+        return buffer.getvalue()
+
+    @bulletin_metrics.timed('build_combined')
+    def build_combined(self, bulletins, output, encoding='ascii85'):
+        # Many bulletins as one document, e.g. a print job for a month. Within one document
+        # ReportLab stores the logo once and static regions share one form each, and the
+        # fonts are declared once. Each bulletin starts on an odd page so duplex printing
+        # keeps its two sides together. bulletins is a list of BulletinData.
+        for data in bulletins:
+            self.check_params(data)
+        story = []
+        for i, data in enumerate(bulletins):
+            if i:
+                story += [PageBreak(), DocIf('doc.page % 2 == 0', [PageBreak()])]
+            story += BulletinRender(self, data).build_story()
+        buffer = io.BytesIO()
+        with stream_encoding(encoding) as options:
+            doc = self.new_doc(buffer, **options)
+            with bulletin_metrics.span('doc_build'):
+                doc.build(story)
+        pdf = buffer.getvalue()
+        bulletin_metrics.increment('bulletins', len(bulletins))
+        bulletin_metrics.increment('pages', doc.page)
+        bulletin_metrics.increment('pdf_bytes', len(pdf))
+        if hasattr(output, 'write'):
+            output.write(pdf)
+        else:
+            with open(output, 'wb') as f:
+                f.write(pdf)
+        return len(pdf)
+
+    def check_params(self, data):
+        # Runs before any layout, so a bulletin missing params fails fast rather than after a full build
+        missing = data.missing_params()
+        if not missing:
+            return
+        message = f"Bulletin for {data.service_date} is missing params used by its order of worship: {', '.join(missing)}"
+        if self.strict_params:
+            raise ValueError(message)
+        print(message)
+
+    def options(self):
+        # Settings that change the rendered output
+        return {'auto_fit': self.auto_fit}
+
+    def logo(self):
+        # The logo, resized and flattened once for this print width
+        return bulletin_assets.default_assets().prepare('pilgrim.PNG', self.frameWidth/1.2)
+
+
+class BulletinRender():
+    # The story for one bulletin, laid out with a builder's shared styles and geometry
+    def __init__(self, builder, data):
+        self.builder = builder
+        self.style = builder.style
+        self.frameWidth = builder.frameWidth
+        self.frameHeight = builder.frameHeight
+        self.data = data
+
+        # Create a list to store the content (story) of the PDF
+        self.story = []
+
+    def paragraph(self, markup, style):
+        # Text is parsed and broken into lines once per process, not once per bulletin
+        return bulletin_paragraphs.default_paragraphs().paragraph(markup, style)
+
+    def hspace(self, points):
+        self.story.append(Spacer(0, points))
+
+    def print_static(self, name, print_section):
+        # Sections that never change are laid out once and placed as a pre-rendered form
+        if not bulletin_static.available():
+            print_section()
+            return
+        region = bulletin_static.default_regions().region(
+            name, self.frameWidth, lambda: self._collect(print_section), key_parts=[self.builder.logo().path, self.builder.options()])
+        self.story.append(region)
+
+    def boxed_rows(self, height, header, body):
+        # header and body are (markup, style) pairs; with auto-fit the body shrinks to fit the box
+        if self.builder.auto_fit:
+            body = bulletin_autofit.default_autofit().fit(header, body, self.frameWidth, height)
+        return [[self.paragraph(markup, style)] for markup, style in header + body]
+
+    def _collect(self, print_section):
+        # Run a _print_* method against an empty story and return what it added
+        story, self.story = self.story, []
+        try:
+            print_section()
+            return self.story
+        finally:
+            self.story = story
+
+    def build(self, output):
+        with bulletin_metrics.span('build_story'):
+            self.build_story()
+
+        # Build the PDF document using the defined story
+        doc = self.builder.new_doc(output)
+        with bulletin_metrics.span('doc_build'):
+            doc.build(self.story)
+        bulletin_metrics.increment('pages', doc.page)
+
+    def build_story(self):
+        # Print the back of the bulletin
+        self._print_back_page()
+
+        # Add a FrameBreak to jump to the next frame
+        self.story.append(FrameBreak())
+
+        # Print the front of the bulletin
+        self._print_front_page()
+
+        # Add a PageBreak to move to the logical inner side of the bulletin
+        self.story.append(PageBreak())
+
+        self._print_morning_worship()
+
+        self.story.append(FrameBreak())
+
+        self._print_evening_worship()
+        return self.story
+
+    @bulletin_metrics.timed('print_back_page')
+    def _print_back_page(self):
+        # Add Welcome! Section
+        self.print_static('welcome', self._print_welcome)
+
+        # Add the custom element to the Story
+        self._print_announcements()
+
+        self.hspace(0.25 * inch)
+
+        # Add the serving schedule section
+        self._print_serving_schedule()
+
+    @bulletin_metrics.timed('print_welcome')
+    def _print_welcome(self):
+        height = self.frameHeight/6
+        welcome = self.boxed_rows(height, [("<b>WELCOME!</b>", self.style['centered'])], [("<b>Welcome to the holy service of worship to the Triune God of Creation and Redemption. It is a great privilege to gather to worship the King of kings. If you are visiting with us, we warmly welcome you, and look forward to getting to know you better in our fellowship time after worship. May God’s high feast day be a delight to your soul as you commune with Him in worship!</b>", self.style['regular'])])
+        self.story.append(RectWithTable(self.frameWidth, height, welcome))
+
+    @bulletin_metrics.timed('print_announcements')
+    def _print_announcements(self):
+        height = self.frameHeight/1.7
+        announcements = self.boxed_rows(height, [("<b>ANNOUNCEMENTS</b>", self.style['centered'])], [(item, self.style['regular']) for item in self.data.params.get('announcements', [])])
+        # Create a custom RectWithTable element
+        self.story.append(RectWithTable(self.frameWidth, height, announcements))
+
+    @bulletin_metrics.timed('print_serving_schedule')
+    def _print_serving_schedule(self):
+        headers = [self.paragraph("<b><u>SERVING SCHEDULE</u></b>", self.style['regular']), self.paragraph("<b>Today:</b>", self.style['regular']), self.paragraph("<b>Next Week:</b>", self.style['regular'])]
+        snack_schedule = self.data.getSchedule('coffee_snack_schedule')
+        midweek_theme_schedule = self.data.getSchedule('midweek_theme_schedule')
+        data = [
+            headers,
+            [self.paragraph("<b>Coffee Snack:</b>", self.style['regular']), self.paragraph(snack_schedule[0], self.style['regular']), self.paragraph(snack_schedule[1], self.style['regular'])],
+            [self.paragraph("<b>Midweek Theme:</b>", self.style['regular']), self.paragraph(midweek_theme_schedule[0], self.style['regular']), self.paragraph(midweek_theme_schedule[1], self.style['regular'])]
+        ]
+        self.story.append(Table(
+            data=data,
+            style=[]
+        ))
+
+    @bulletin_metrics.timed('print_front_page')
+    def _print_front_page(self):
+        self.print_static('front_top', self._print_top_of_front_page)
+        self._print_bottom_of_front_page()
+
+    @bulletin_metrics.timed('print_top_of_front_page')
+    def _print_top_of_front_page(self):
+        self._print_pilgrim_title()
+        self.hspace(0.25 * inch)
+        self._print_pilgrim_image()
+        self.hspace(0.25 * inch)
+
+    @bulletin_metrics.timed('print_pilgrim_title')
+    def _print_pilgrim_title(self):
+        # Add text to the second frame
+        self.story.append(
+            self.paragraph(
+                '<b>P I L G R I M</b>',
+                self.style['bulletin_title'],
+            )
+        )
+        self.story.append(
+            self.paragraph(
+                "<b>PRESBYTERIAN CHURCH</b>",
+                self.style['bulletin_subtitle']
+            )
+        )
+        self.story.append(
+            self.paragraph(
+                "<b><i>A Congregation of the Orthodox Presbyterian Church</i></b>",
+                self.style['centered']
+            )
+        )
+        self.story.append(
+            self.paragraph(
+                "<b>Metamora, Michigan</b>",
+                self.style['centered_xlarge']
+            )
+        )
+
+    @bulletin_metrics.timed('print_pilgrim_image')
+    def _print_pilgrim_image(self):
+        width = self.frameWidth/1.2
+        logo = self.builder.logo()
+        image = Image(logo.path, width=width, height=width * logo.aspect_ratio)
+        self.story.append(image)
+
+    @bulletin_metrics.timed('print_bottom_of_front_page')
+    def _print_bottom_of_front_page(self):
+        self.story.append(
+            self.paragraph(
+                f"<b>THE LORD'S DAY<br/><i>{self.data.params.get('date')}</i></b>",
+                self.style['centered_xlarge']
+            )
+        )
+
+        self.print_static('front_bottom', self._print_service_times_and_inscription)
+
+    @bulletin_metrics.timed('print_service_times_and_inscription')
+    def _print_service_times_and_inscription(self):
+        self.hspace(0.15 * inch)
+
+        self.story.append(
+            self.paragraph(
+                "<b>MORNING WORSHIP — 11:00 AM / EVENING WORSHIP — 6:00 PM</b>",
+                self.style['centered']
+            )
+        )
+
+        self.hspace(0.15 * inch)
+
+        self.story.append(
+            self.paragraph(
+                "<b><i>“Blessed is the people that know the joyful sound: They shall walk, O Lord, in the light of your countenance. In Your name shall they rejoice all the day; and in your righteousness they shall be exalted.”</i><br/>Psalm 89:15-16 — Inscribed on the church bell in 1878.</b>",
+                self.style['centered']
+            )
+        )
+    
+    @bulletin_metrics.timed('print_morning_worship')
+    def _print_morning_worship(self):
+        self.story.append(self.paragraph(
+            "<b>MORNING WORSHIP</b>",
+            self.style['centered_xlarge']
+        ))
+        self.hspace(0.1 * inch)
+
+        self._print_leading_elders()
+
+        self.hspace(0.2 * inch)
+
+        self._print_order_of_worship("morning")
+    
+    @bulletin_metrics.timed('print_leading_elders')
+    def _print_leading_elders(self):
+        data = [
+            [self.paragraph("<b>Leading in Worship:</b>", self.style['centered']), self.paragraph("<b>Preaching:</b>", self.style['centered'])],
+            [self.paragraph(self.data.params.get('leading_in_worship', ""), self.style['centered']), self.paragraph(self.data.params.get('preaching', ""), self.style['centered'])]
+        ]
+
+        self.story.append(Table(
+            data,
+            colWidths=120,
+            style=[
+                ('ALIGN', (0, 0), (-1,-1), 'CENTER')
+            ]
+        ))
+
+    @bulletin_metrics.timed('print_order_of_worship')
+    def _print_order_of_worship(self, service):
+        oow = self.data.generate_oow(service)
+        for section in oow.sections:
+            self._print_oow_section(section.title, section.lines)
+        self.story.append(self.paragraph(
+            oow.benediction_song,
+            self.style['xlarge']
+        ))
+        if service == 'morning':
+            self.story.append(self.paragraph(
+                "<i>* Congregation standing</i>",
+                self.style['right']
+            ))
+
+
+    @bulletin_metrics.timed('print_oow_section')
+    def _print_oow_section(self, title, content):
+        # How to indent and some have bullets and some don't?
+        # Maybe use a table
+
+        self.story.append(self.paragraph(
+            f"<b>{title}</b>",
+            self.style['large']
+        ))
+
+        self.story.append(Table(
+            data=[[("*" if line.footnote else ''), self.paragraph(line.text, self.style['large'])] for line in content],
+            colWidths=(0.10 * inch, self.frameWidth - 0.10 * inch),
+            style=[
+                ('LEFTPADDING', (1,0), (1, -1), 0.5 * inch)
+            ]
+        ))
+
+    @bulletin_metrics.timed('print_evening_worship')
+    def _print_evening_worship(self):
+        self.story.append(self.paragraph(
+            "<b>EVENING WORSHIP</b>",
+            self.style['centered_xlarge']
+        ))
+
+        self.hspace(0.2 * inch)
+
+        self._print_order_of_worship("evening")
+
+        self.hspace(0.2 * inch)
+
+        self._print_congregational_confession()
+
+    @bulletin_metrics.timed('print_congregational_confession')
+    def _print_congregational_confession(self):
+        height = self.frameHeight/3.3
+        data = self.boxed_rows(
+            height,
+            [(f"<b>{self.data.params.get('corporate_confession_title', '')}</b>", self.style['centered_large'])],
+            [(self.data.params.get('corporate_confession_text', ""), self.style['large'])]
+        )
+        self.story.append(RectWithTable(self.frameWidth, height, data))
@@ -0,0 +1,132 @@
+import argparse
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import bulletin_metrics
+
+DEFAULT_CACHE_PATH = os.path.join('.bulletin-cache', 'items.sqlite')
+# Seconds a cached item is served before it is fetched again (ignored offline)
+DEFAULT_TTL = 300
+
+
+class ItemCache():
+    # Read-through cache of DynamoDB items, stored in SQLite keyed by table and key
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, offline=False):
+        self.path = path
+        self.ttl = ttl
+        self.offline = offline
+        self.lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        # A connection must not cross a fork, so pool workers open their own
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "table_name TEXT NOT NULL, item_key TEXT NOT NULL, item BLOB NOT NULL, fetched_at REAL NOT NULL, "
+                "PRIMARY KEY (table_name, item_key))"
+            )
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    def _fresh(self, fetched_at):
+        return self.offline or self.ttl is None or time.time() - fetched_at <= self.ttl
+
+    def get(self, table_name, key):
+        return self.get_many(table_name, [key]).get(key)
+
+    def get_many(self, table_name, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        with self.lock:
+            rows = self._connection().execute(
+                f"SELECT item_key, item, fetched_at FROM items WHERE table_name = ? AND item_key IN ({','.join('?' * len(keys))})",
+                [table_name] + keys,
+            ).fetchall()
+        items = {key: pickle.loads(item) for key, item, fetched_at in rows if self._fresh(fetched_at)}
+        bulletin_metrics.increment('cache_hits', len(items), cache='items')
+        bulletin_metrics.increment('cache_misses', len(keys) - len(items), cache='items')
+        return items
+
+    def get_range(self, table_name, start, end):
+        # Cached items whose keys sort between start and end inclusive, e.g. a range of dates
+        with self.lock:
+            rows = self._connection().execute(
+                "SELECT item_key, item, fetched_at FROM items WHERE table_name = ? AND item_key BETWEEN ? AND ? ORDER BY item_key",
+                [table_name, start, end],
+            ).fetchall()
+        return {key: pickle.loads(item) for key, item, fetched_at in rows if self._fresh(fetched_at)}
+
+    def put(self, table_name, key, item):
+        self.put_many(table_name, {key: item})
+
+    def put_many(self, table_name, items):
+        now = time.time()
+        with self.lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO items (table_name, item_key, item, fetched_at) VALUES (?, ?, ?, ?)",
+                [(table_name, key, pickle.dumps(item), now) for key, item in items.items()],
+            )
+            conn.commit()
+
+    def invalidate(self, table_name=None, keys=None):
+        # Drop specific keys, a whole table, or everything
+        query = "DELETE FROM items"
+        args = []
+        if table_name is not None:
+            query += " WHERE table_name = ?"
+            args.append(table_name)
+            if keys:
+                query += f" AND item_key IN ({','.join('?' * len(keys))})"
+                args += list(keys)
+        with self.lock:
+            conn = self._connection()
+            removed = conn.execute(query, args).rowcount
+            conn.commit()
+        return removed
+
+
+_default_cache = None
+
+
+def configure(path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, offline=False):
+    global _default_cache
+    _default_cache = ItemCache(path, ttl=ttl, offline=offline)
+    return _default_cache
+
+
+def default_cache():
+    # None unless a caller has turned caching on
+    return _default_cache
+
+
+def _after_fork():
+    # Pool workers can be forked while a prefetching thread holds the lock
+    if _default_cache is not None:
+        _default_cache.lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Invalidate cached bulletin items.")
+    parser.add_argument('--path', default=DEFAULT_CACHE_PATH, help="Cache database file")
+    parser.add_argument('--table', help="Only invalidate items from this table (BulletinParams or OrdersOfWorship)")
+    parser.add_argument('keys', nargs='*', help="Keys to invalidate within --table")
+    args = parser.parse_args()
+    if args.keys and not args.table:
+        parser.error("keys require --table")
+    removed = ItemCache(args.path).invalidate(args.table, args.keys)
+    print(f"Removed {removed} cached items")
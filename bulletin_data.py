@@ -1,60 +1,196 @@
-from reportlab.platypus import Paragraph
-from jinja2 import Template
-import boto3
-from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+
+import bulletin_backends
+import bulletin_cache
+import bulletin_metrics
+import bulletin_oow
+
+PARAMS_TABLE = "BulletinParams"
+OOW_TABLE = "OrdersOfWorship"
+# Key attribute of each table
+KEY_NAMES = {
+    PARAMS_TABLE: 'service_date',
+    OOW_TABLE: 'service_id',
+}
+# Params the builder reads itself; everything else in an item is there for the orders of worship
+BULLETIN_ATTRIBUTES = frozenset([
+    'service_date', 'date', 'oow_id', 'announcements', 'coffee_snack_schedule', 'midweek_theme_schedule',
+    'leading_in_worship', 'preaching', 'corporate_confession_title', 'corporate_confession_text',
+])
+# Dates fetched per round of iter_bulletin_data; the first bulletin renders once its chunk arrives
+PREFETCH_CHUNK = 8
+
+def data_backend(backend=None, dynamodb=None, cache=None, connections=None):
+    # The configured backend unless one is given; a DynamoDB resource or connections
+    # passed in directly get their own backend. Reads go through the item cache when there is
+    # one, unless cache is False.
+    if isinstance(backend, bulletin_backends.CachedBackend):
+        return backend
+    if backend is None and (dynamodb is not None or connections is not None):
+        backend = bulletin_backends.DynamoDBBackend(dynamodb, connections)
+    elif backend is None:
+        backend = bulletin_backends.default_backend()
+    if cache is None:
+        cache = bulletin_cache.default_cache()
+    if cache is not None and cache is not False:
+        backend = bulletin_backends.CachedBackend(backend, cache)
+    return backend
+
+def default_templates():
+    # Jinja takes longer to import than a cached build takes to fetch its data
+    import bulletin_templates
+    return bulletin_templates.default_engine()
+
+def params_attributes(templates=None):
+    # The params attributes worth fetching: the builder's own and every variable of the orders
+    # of worship compiled so far. None (the whole item) until an order of worship has been seen.
+    variables = (templates or default_templates()).known_variables()
+    if not variables:
+        return None
+    return BULLETIN_ATTRIBUTES | variables
+
+def complete_params(bulletins, attributes, backend):
+    # A projected fetch misses params used only by orders of worship not compiled at the
+    # time; fetch just those for the bulletins that need them
+    if attributes is None:
+        return
+    wanted = {data.service_date: data.required_params() - attributes for data in bulletins}
+    wanted = {service_date: names for service_date, names in wanted.items() if names}
+    if not wanted:
+        return
+    fetched = backend.get_items(PARAMS_TABLE, KEY_NAMES[PARAMS_TABLE], list(wanted), attributes=frozenset().union(*wanted.values()))
+    for data in bulletins:
+        data.params.update(fetched.get(data.service_date, {}))
+
+def fetch_params_range(start, end, dynamodb=None, cache=None, backend=None):
+    # The params of every bulletin dated between start and end inclusive, in date order
+    backend = data_backend(backend, dynamodb, cache)
+    return backend.get_range(PARAMS_TABLE, KEY_NAMES[PARAMS_TABLE], start, end)
+
+@bulletin_metrics.timed('prefetch_bulletin_data')
+def prefetch_bulletin_data(service_dates, dynamodb=None, cache=None, backend=None, params_by_date=None):
+    # Fetch everything needed for many bulletins in two batched round trips:
+    # all params items first, then every order of worship they reference.
+    # Params already read, e.g. by fetch_params_range, are not fetched again.
+    backend = data_backend(backend, dynamodb, cache)
+    templates = default_templates()
+    attributes = params_attributes(templates)
+    known = params_by_date or {}
+    params_by_date = {service_date: known[service_date] for service_date in service_dates if service_date in known}
+    missing = [service_date for service_date in service_dates if service_date not in known]
+    if missing:
+        params_by_date.update(backend.get_items(PARAMS_TABLE, KEY_NAMES[PARAMS_TABLE], missing, attributes=attributes))
+    oow_ids = [oow_id for params in params_by_date.values() for oow_id in params.get('oow_id', {}).values()]
+    # Converted once here, so bulletins sharing an order of worship share one instance
+    oows = {oow_id: bulletin_oow.order_of_worship(oow) for oow_id, oow in backend.get_items(OOW_TABLE, KEY_NAMES[OOW_TABLE], oow_ids).items()}
+    # Compile them now, even where rendering happens in another process, so the next
+    # chunk's params are fetched with a projection of just the variables they use
+    for oow in oows.values():
+        templates.oow_variables(oow)
+    data = {}
+    for service_date in service_dates:
+        params = params_by_date.get(service_date)
+        if params is None:
+            print(f"No item found with service date: {service_date}")
+            params = {}
+        service_oows = {oow_id: oows[oow_id] for oow_id in params.get('oow_id', {}).values() if oow_id in oows}
+        data[service_date] = BulletinData(service_date, params=params, oows=service_oows, templates=templates, cache=False, backend=backend)
+    complete_params([data[service_date] for service_date in missing], attributes, backend)
+    return data
+
+def iter_bulletin_data(service_dates, chunk_size=PREFETCH_CHUNK, dynamodb=None, cache=None, backend=None, params_by_date=None):
+    # Yields (service_date, BulletinData) in order, prefetching chunk_size dates at a time.
+    # The next chunk is fetched on a background thread while the caller renders the current one.
+    backend = data_backend(backend, dynamodb, cache)
+    service_dates = list(dict.fromkeys(service_dates))
+    chunks = [service_dates[start:start + chunk_size] for start in range(0, len(service_dates), chunk_size)]
+    if not chunks:
+        return
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch') as executor:
+        # The backend is already resolved, item cache included when there is one
+        pending = executor.submit(prefetch_bulletin_data, chunks[0], cache=False, backend=backend, params_by_date=params_by_date)
+        for i, chunk in enumerate(chunks):
+            prefetched = pending.result()
+            if i + 1 < len(chunks):
+                pending = executor.submit(prefetch_bulletin_data, chunks[i + 1], cache=False, backend=backend, params_by_date=params_by_date)
+            for service_date in chunk:
+                yield service_date, prefetched[service_date]
 
 class BulletinData():
-    def __init__(self, service_date):
+    def __init__(self, service_date, dynamodb=None, params=None, oows=None, templates=None, cache=None, backend=None, connections=None):
         self.service_date = service_date
-        self.dynamodb = boto3.resource('dynamodb', region_name='us-east-1', endpoint_url='http://localhost:8000')
-        self.params = self.fetch_bulletin_params()
-
-    # Refactor this to store OOW params by their oow and take note of the fact we know exactly what variables will need to be replaced in there
-    # for validation, etc
-    def fetch_bulletin_params(self):
-        table_name = "BulletinParams"
-        table = self.dynamodb.Table(table_name)
-        try:
-            response = table.get_item(
-                Key={
-                    'service_date': self.service_date
-                }
-            )
-            item = response.get('Item', {})
-            if item:
-                return item
-            else:
-                print(f"No item found with service date: {self.service_date}")
-                return {}
-        except ClientError as e:
-            print(f"Error retrieving item: {e.response['Error']['Message']}")
-
-    
+        self._templates = templates
+        # Where items come from: DynamoDB, a directory of JSON files, or memory (see bulletin_backends)
+        self.backend = data_backend(backend, dynamodb, cache, connections)
+        attributes = None
+        if params is None:
+            attributes = params_attributes(self.templates)
+            params = self.fetch_bulletin_params(attributes) or {}
+        self.params = params
+        # Orders of worship keyed by service_id, fetched up front rather than mid-story.
+        # They are immutable, so they can be shared with other bulletins and threads.
+        if oows is None:
+            oows = self.prefetch_oows()
+        self.oows = {service_id: bulletin_oow.order_of_worship(oow) for service_id, oow in oows.items()}
+        complete_params([self], attributes, self.backend)
+
+    @property
+    def templates(self):
+        # Jinja takes longer to import than a cached build takes to fetch its data
+        if self._templates is None:
+            self._templates = default_templates()
+        return self._templates
+
+    def required_params(self):
+        # Every param the bulletin's orders of worship refer to, found when they are compiled
+        required = set()
+        for service_id in self.params.get('oow_id', {}).values():
+            if service_id in self.oows:
+                required |= self.templates.oow_variables(self.oows[service_id])
+        return required
+
+    def output_params(self):
+        # The params that can change the rendered bulletin. Whole and projected items of the
+        # same bulletin agree on these, so both give the same render key.
+        used = BULLETIN_ATTRIBUTES | self.required_params()
+        return {name: value for name, value in self.params.items() if name in used}
+
+    def missing_params(self):
+        # Params an order of worship uses that this bulletin does not have; Jinja would render them as empty text
+        return sorted(self.required_params() - set(self.params))
+
+    @bulletin_metrics.timed('fetch_bulletin_params')
+    def fetch_bulletin_params(self, attributes=None):
+        item = self.backend.get_item(PARAMS_TABLE, KEY_NAMES[PARAMS_TABLE], self.service_date, attributes)
+        if item is None:
+            print(f"No item found with service date: {self.service_date}")
+            return {}
+        return item
+
+    @bulletin_metrics.timed('prefetch_oows')
+    def prefetch_oows(self):
+        # Both services' orders of worship in a single batched read
+        oow_ids = self.params.get('oow_id', {}).values()
+        if not oow_ids:
+            return {}
+        return self.backend.get_items(OOW_TABLE, KEY_NAMES[OOW_TABLE], oow_ids)
+
+    @bulletin_metrics.timed('generate_oow')
     def generate_oow(self, service):
         if self.params.get('oow_id') is None:
-            return {}
-        oow = self.fetch_oow(self.params['oow_id'][service])
-        for section in oow['sections']:
-            for line in section['content']:
-                line['text'] = Template(line['text']).render(self.params)
-        return oow
+            return bulletin_oow.EMPTY
+        service_id = self.params['oow_id'][service]
+        oow = self.oows.get(service_id) or self.fetch_oow(service_id)
+        if oow is None:
+            return bulletin_oow.EMPTY
+        return self.templates.render_oow(oow, self.params)
 
+    @bulletin_metrics.timed('fetch_oow')
     def fetch_oow(self, service_id):
-        table_name = "OrdersOfWorship"
-        table = self.dynamodb.Table(table_name)
-        try:
-            response = table.get_item(
-                Key={
-                    'service_id': service_id
-                }
-            )
-            item = response.get('Item', {})
-            if item:
-                return item
-            else:
-                print(f"No item found with service ID: {service_id}")
-        except ClientError as e:
-            print(f"Error retrieving item: {e.response['Error']['Message']}")
+        item = self.backend.get_item(OOW_TABLE, KEY_NAMES[OOW_TABLE], service_id)
+        if item is None:
+            print(f"No item found with service ID: {service_id}")
+        return bulletin_oow.order_of_worship(item)
 
     def getSchedule(self, schedule_name):
         schedule = self.params.get(schedule_name)
@@ -62,4 +198,4 @@ class BulletinData():
             schedule = ["",""]
         elif len(schedule) == 1:
             schedule.append("")
-        return schedule
\ No newline at end of file
+        return schedule
@@ -0,0 +1,26 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+# mkstemp creates files readable only by their owner; written files get the usual
+# permissions instead. Read once at import, as changing the umask is not thread-safe.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextmanager
+def atomic_write(path, mode='wb', **open_args):
+    # Yields a file under a unique temporary name next to path, renamed over path once
+    # written, so readers never see half a file and concurrent writers never collide
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=f"{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, **open_args) as f:
+            yield f
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
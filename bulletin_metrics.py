@@ -0,0 +1,165 @@
+import functools
+import json
+import os
+import threading
+import time
+
+import bulletin_files
+
+# Metrics are off unless enable() is called; every hook below then costs one global lookup
+_recorder = None
+
+
+class _NullSpan():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span():
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.record_span(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Recorder():
+    # Aggregates span timings and counters, optionally logging each span as a JSON line
+    def __init__(self, log=None):
+        self.lock = threading.Lock()
+        self.log = log
+        self.spans = {}
+        self.counters = {}
+
+    def record_span(self, name, seconds):
+        with self.lock:
+            count, total, longest = self.spans.get(name, (0, 0.0, 0.0))
+            self.spans[name] = (count + 1, total + seconds, max(longest, seconds))
+        self.write_event({'event': 'span', 'span': name, 'seconds': round(seconds, 6)})
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def write_event(self, event):
+        if self.log is None:
+            return
+        line = json.dumps(dict(event, ts=round(time.time(), 6), pid=os.getpid())) + "\n"
+        with self.lock:
+            self.log.write(line)
+            self.log.flush()
+
+    def drain(self):
+        # Hand over everything recorded so far and start again; used to ship metrics out of pool workers
+        with self.lock:
+            snapshot = {'spans': self.spans, 'counters': self.counters}
+            self.spans = {}
+            self.counters = {}
+        return snapshot
+
+    def merge(self, snapshot):
+        with self.lock:
+            for name, (count, total, longest) in snapshot['spans'].items():
+                old_count, old_total, old_longest = self.spans.get(name, (0, 0.0, 0.0))
+                self.spans[name] = (old_count + count, old_total + total, max(old_longest, longest))
+            for key, value in snapshot['counters'].items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def summary(self):
+        with self.lock:
+            return {
+                'spans': {name: {'count': count, 'seconds': round(total, 6), 'max_seconds': round(longest, 6)}
+                          for name, (count, total, longest) in sorted(self.spans.items())},
+                'counters': [dict(labels, name=name, value=value) for (name, labels), value in sorted(self.counters.items())],
+            }
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP bulletin_span_seconds Time spent in each stage of bulletin builds.",
+            "# TYPE bulletin_span_seconds summary",
+        ]
+        with self.lock:
+            spans = sorted(self.spans.items())
+            counters = sorted(self.counters.items())
+        for name, (count, total, longest) in spans:
+            lines.append(f'bulletin_span_seconds_sum{{span="{name}"}} {total:.6f}')
+            lines.append(f'bulletin_span_seconds_count{{span="{name}"}} {count}')
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f"bulletin_{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            label_text = ','.join(f'{key}="{label}"' for key, label in labels)
+            lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Write then rename, so a node_exporter textfile collector never reads half a file
+        with bulletin_files.atomic_write(path, 'w') as f:
+            f.write(self.prometheus_text())
+
+
+def _after_fork():
+    # A fork can happen while another thread holds the lock, e.g. when the pool replaces
+    # a recycled worker during a pipelined batch; the child must not inherit it held
+    if _recorder is not None:
+        _recorder.lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def enable(log_path=None):
+    global _recorder
+    log = open(log_path, 'a') if log_path else None
+    _recorder = Recorder(log)
+    return _recorder
+
+
+def disable():
+    global _recorder
+    if _recorder is not None and _recorder.log is not None:
+        _recorder.log.close()
+    _recorder = None
+
+
+def recorder():
+    return _recorder
+
+
+def span(name):
+    if _recorder is None:
+        return _NULL_SPAN
+    return _Span(_recorder, name)
+
+
+def timed(name):
+    # Decorator form of span(); a disabled recorder adds a single check per call
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return function(*args, **kwargs)
+            with _Span(_recorder, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def increment(name, value=1, **labels):
+    if _recorder is not None:
+        _recorder.increment(name, value, **labels)
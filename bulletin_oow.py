@@ -0,0 +1,47 @@
+import hashlib
+import json
+from collections import namedtuple
+
+# Orders of worship as small immutable tuples rather than the nested dicts they are stored
+# as. Nothing can change one after it is read, so the same instance can be cached and
+# shared by any number of renders and threads; rendering makes a new one.
+
+
+class Line(namedtuple('Line', ['text', 'footnote'])):
+    # footnote marks lines sung or read standing, printed with an asterisk
+    __slots__ = ()
+
+
+class Section(namedtuple('Section', ['title', 'lines'])):
+    __slots__ = ()
+
+
+class OrderOfWorship(namedtuple('OrderOfWorship', ['service_id', 'version', 'benediction_song', 'sections'])):
+    __slots__ = ()
+
+    @classmethod
+    def from_item(cls, item):
+        sections = tuple(
+            Section(section.get('title', ''), tuple(Line(line.get('text', ''), 'footnote' in line) for line in section.get('content', [])))
+            for section in item.get('sections', [])
+        )
+        return cls(item.get('service_id'), oow_version(item), item.get('benediction_song', ''), sections)
+
+
+# Stands in for an order of worship that could not be found
+EMPTY = OrderOfWorship(None, None, '', ())
+
+
+def oow_version(item):
+    # Prefer an explicit version attribute, otherwise hash the templated content
+    if item.get('version') is not None:
+        return str(item['version'])
+    content = [[line.get('text', '') for line in section.get('content', [])] for section in item.get('sections', [])]
+    return hashlib.sha1(json.dumps(content, default=str).encode('utf-8')).hexdigest()
+
+
+def order_of_worship(item):
+    # An OrderOfWorship from a fetched item; ones already converted are returned as they are
+    if item is None or isinstance(item, OrderOfWorship):
+        return item
+    return OrderOfWorship.from_item(item)
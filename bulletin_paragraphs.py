@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+from reportlab.platypus import Paragraph
+
+import bulletin_metrics
+
+# Distinct (markup, style) pairs kept; announcements change weekly, most other text never does
+DEFAULT_CACHE_SIZE = 2048
+
+
+class CachedParagraph(Paragraph):
+    # A Paragraph made from one already parsed, reusing the line breaks worked out by any
+    # paragraph of the same markup and style at the same width. The constructor is left as
+    # Paragraph's, since split() makes its pieces with self.__class__; pieces made that way
+    # have no shared wraps and wrap as any Paragraph does.
+    _wraps = None
+
+    @classmethod
+    def from_parsed(cls, parsed, wraps):
+        paragraph = cls.__new__(cls)
+        paragraph.__dict__.update(parsed)
+        paragraph._wraps = wraps
+        return paragraph
+
+    def wrap(self, availWidth, availHeight):
+        if self._wraps is None:
+            return Paragraph.wrap(self, availWidth, availHeight)
+        state = self._wraps.get(availWidth)
+        if state is not None:
+            self.__dict__.update(state)
+            return self.width, self.height
+        before = dict(self.__dict__)
+        result = Paragraph.wrap(self, availWidth, availHeight)
+        # Only what wrap itself set, such as the broken lines and the word list drawing uses.
+        # wrapOn sets canv beforehand; keeping it would hold every document's canvas alive.
+        self._wraps[availWidth] = {name: value for name, value in self.__dict__.items() if before.get(name, before) is not value}
+        return result
+
+
+class ParagraphCache():
+    # ReportLab parses a paragraph's markup each time one is made, and breaks it into lines
+    # each time it is wrapped. The same text appears in every bulletin, so both are done
+    # once per (markup, style) and width, and each paragraph handed out is a fresh flowable.
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def paragraph(self, markup, style):
+        # Styles are keyed by identity; the builder's styles are made once and never changed
+        key = (markup, style)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                bulletin_metrics.increment('cache_hits', cache='paragraphs')
+        if entry is None:
+            bulletin_metrics.increment('cache_misses', cache='paragraphs')
+            entry = (dict(Paragraph(markup, style).__dict__), {})
+            with self.lock:
+                self.entries[key] = entry
+                if len(self.entries) > self.cache_size:
+                    self.entries.popitem(last=False)
+        return CachedParagraph.from_parsed(*entry)
+
+
+_default_paragraphs = None
+
+
+def configure(cache_size=DEFAULT_CACHE_SIZE):
+    global _default_paragraphs
+    _default_paragraphs = ParagraphCache(cache_size)
+    return _default_paragraphs
+
+
+def default_paragraphs():
+    if _default_paragraphs is None:
+        configure()
+    return _default_paragraphs
@@ -0,0 +1,152 @@
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+
+# Seconds between samples
+DEFAULT_INTERVAL = 0.001
+# Functions listed in the report
+DEFAULT_TOP = 25
+
+# Functions that start a stage of a build, by file and qualified name. A sample belongs to the
+# innermost stage on its stack, so the orders of worship rendered during story assembly count
+# as generate_oow.
+STAGES = {
+    ('bulletin_data.py', 'BulletinData.__init__'): 'fetch',
+    ('bulletin_data.py', 'prefetch_bulletin_data'): 'fetch',
+    ('bulletin_data.py', 'BulletinData.generate_oow'): 'generate_oow',
+    ('bulletin_builder.py', 'BulletinRender.build_story'): 'story',
+    ('doctemplate.py', 'BaseDocTemplate.build'): 'doc_build',
+}
+# Code objects have no qualified name before Python 3.11; within one file the bare name is enough
+STAGES_BY_NAME = {(filename, name.rsplit('.', 1)[-1]): stage for (filename, name), stage in STAGES.items()}
+STAGE_ORDER = ('fetch', 'generate_oow', 'story', 'doc_build', 'other')
+# Library paths are shown from inside these directories, longest first
+LIBRARY_DIRS = sorted({sysconfig.get_paths()[name] for name in ('purelib', 'platlib', 'stdlib')}, key=len, reverse=True)
+
+
+def qualname(code):
+    return getattr(code, 'co_qualname', code.co_name)
+
+
+def label(code):
+    # function (file:line), with paths cut down to the package or module
+    path = code.co_filename
+    for directory in LIBRARY_DIRS + [os.getcwd()]:
+        if path.startswith(directory + os.sep):
+            path = path[len(directory) + 1:]
+            break
+    return f"{qualname(code)} ({path}:{code.co_firstlineno})"
+
+
+def stage_of(stack):
+    for code in reversed(stack):
+        filename = os.path.basename(code.co_filename)
+        if hasattr(code, 'co_qualname'):
+            stage = STAGES.get((filename, code.co_qualname))
+        else:
+            stage = STAGES_BY_NAME.get((filename, code.co_name))
+        if stage is not None:
+            return stage
+    return None
+
+
+class Sampler():
+    # Samples the stack of every thread at a fixed interval. Far cheaper than tracing each
+    # call, so ReportLab's share of a build is not inflated by the profiler itself.
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        # (thread name, code objects from the outermost frame in) -> samples, and the seconds they cover
+        self.samples = Counter()
+        self.seconds = Counter()
+        self.elapsed = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # A busy thread only gives up the GIL every switch interval (5 ms by default), which
+        # would leave the sampler waiting that long between looks
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval))
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        own = threading.get_ident()
+        main = threading.main_thread().ident
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            covered, last = now - last, now
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                stack.reverse()
+                # Other threads are mostly idle pool threads waiting for work; keep them only while they fetch
+                if ident != main and stage_of(stack) is None:
+                    continue
+                key = (names.get(ident, 'thread'), tuple(stack))
+                self.samples[key] += 1
+                self.seconds[key] += covered
+
+    def stages(self):
+        seconds = Counter()
+        for (thread, stack), covered in self.seconds.items():
+            seconds[stage_of(stack) or 'other'] += covered
+        return seconds
+
+    def functions(self):
+        # Seconds spent in each function itself, and in it or anything it called
+        own = Counter()
+        total = Counter()
+        for (thread, stack), covered in self.seconds.items():
+            own[stack[-1]] += covered
+            for code in set(stack):
+                total[code] += covered
+        return own, total
+
+    def report(self, top=DEFAULT_TOP):
+        sampled = sum(self.seconds.values()) or 1
+        lines = [f"Profiled {self.elapsed:.2f}s: {sum(self.samples.values())} samples every {self.interval * 1000:g} ms", ""]
+        lines.append(f"{'stage':<14}{'seconds':>9}{'share':>8}")
+        stages = self.stages()
+        for stage in STAGE_ORDER:
+            lines.append(f"{stage:<14}{stages[stage]:>9.3f}{stages[stage] / sampled:>8.1%}")
+        own, total = self.functions()
+        for title, ranked in (("own time", own), ("time including calls", total)):
+            lines += ["", f"Top {top} functions by {title}", f"{'own s':>8}{'total s':>9}  function"]
+            for code, covered in ranked.most_common(top):
+                lines.append(f"{own[code]:>8.3f}{total[code]:>9.3f}  {label(code)}")
+        return "\n".join(lines)
+
+    def collapsed(self):
+        # One line per distinct stack, outermost frame first, as flamegraph.pl and speedscope read them
+        lines = []
+        for (thread, stack), count in sorted(self.samples.items(), key=lambda item: -item[1]):
+            frames = [thread] + [label(code).replace(';', ',') for code in stack]
+            lines.append(f"{';'.join(frames)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory, top=DEFAULT_TOP):
+        os.makedirs(directory, exist_ok=True)
+        report_path = os.path.join(directory, 'profile.txt')
+        stacks_path = os.path.join(directory, 'profile.collapsed')
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(self.report(top) + "\n")
+        with open(stacks_path, 'w', encoding='utf-8') as f:
+            f.write(self.collapsed())
+        return report_path, stacks_path
@@ -0,0 +1,162 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+
+import bulletin_metrics
+import bulletin_files
+
+DEFAULT_RENDER_CACHE_DIR = os.path.join('.bulletin-cache', 'renders')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_code_version = None
+
+
+def code_version():
+    # Any change to the bulletin modules or the rendering libraries invalidates every entry
+    global _code_version
+    if _code_version is None:
+        # Imported here so a CLI that never uses the render cache does not pay for them
+        import jinja2
+        import reportlab
+        digest = hashlib.sha1(f"reportlab {reportlab.Version} jinja2 {jinja2.__version__}".encode('utf-8'))
+        for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bulletin_*.py'))):
+            with open(path, 'rb') as f:
+                digest.update(os.path.basename(path).encode('utf-8'))
+                digest.update(f.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def _json_default(value):
+    # DynamoDB sets come back unordered, so sort them for a stable hash
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    return str(value)
+
+
+def render_key(params, oows, logo_path, options=None):
+    content = {
+        'code': code_version(),
+        'options': options or {},
+        'params': params,
+        'oows': oows,
+        'logo': os.path.basename(logo_path),
+    }
+    encoded = json.dumps(content, sort_keys=True, default=_json_default).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class RenderCache():
+    # Finished PDFs stored by the hash of everything that went into them
+    def __init__(self, directory=DEFAULT_RENDER_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, service_date, key):
+        # The date is only there to make listings readable; the key alone identifies the content
+        return os.path.join(self.directory, f"{service_date}.{key}.pdf")
+
+    def get(self, service_date, key):
+        path = self._path(service_date, key)
+        try:
+            with open(path, 'rb') as f:
+                pdf = f.read()
+        except FileNotFoundError:
+            bulletin_metrics.increment('cache_misses', cache='render')
+            return None
+        bulletin_metrics.increment('cache_hits', cache='render')
+        # Mark as recently used for eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return pdf
+
+    def put(self, service_date, key, pdf):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(service_date, key)
+        with bulletin_files.atomic_write(path) as f:
+            f.write(pdf)
+        self.evict()
+
+    def entries(self):
+        # (path, size, last used) for every stored PDF, most recently used first
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, '*.pdf')):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda entry: entry[2], reverse=True)
+        return entries
+
+    def evict(self, max_bytes=None):
+        # Remove least recently used PDFs until the cache fits in max_bytes
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        total = 0
+        removed = 0
+        for path, size, last_used in self.entries():
+            total += size
+            if total > max_bytes:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def purge(self, older_than=None):
+        removed = 0
+        cutoff = None if older_than is None else time.time() - older_than
+        for path, size, last_used in self.entries():
+            if cutoff is None or last_used < cutoff:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+_default_render_cache = None
+
+
+def configure(directory=DEFAULT_RENDER_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    global _default_render_cache
+    _default_render_cache = RenderCache(directory, max_bytes)
+    return _default_render_cache
+
+
+def default_render_cache():
+    # None unless a caller has turned the render cache on
+    return _default_render_cache
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or purge the bulletin render cache.")
+    parser.add_argument('--dir', default=DEFAULT_RENDER_CACHE_DIR, help="Render cache directory")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats', help="Show the number and total size of cached PDFs")
+    subparsers.add_parser('list', help="List cached PDFs, most recently used first")
+    purge_parser = subparsers.add_parser('purge', help="Delete cached PDFs")
+    purge_parser.add_argument('--older-than', type=float, metavar='DAYS', help="Only delete PDFs unused for this many days")
+    purge_parser.add_argument('--max-size', type=float, metavar='MB', help="Evict least recently used PDFs down to this size instead")
+    args = parser.parse_args()
+
+    cache = RenderCache(args.dir)
+    if args.command == 'stats':
+        entries = cache.entries()
+        total = sum(size for path, size, last_used in entries)
+        print(f"{len(entries)} cached bulletins, {total / 1024 / 1024:.1f} MB in {args.dir}")
+    elif args.command == 'list':
+        for path, size, last_used in cache.entries():
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_used))}  {size / 1024:8.1f} KB  {os.path.basename(path)}")
+    elif args.max_size is not None:
+        print(f"Evicted {cache.evict(int(args.max_size * 1024 * 1024))} cached bulletins")
+    else:
+        older_than = None if args.older_than is None else args.older_than * 24 * 60 * 60
+        print(f"Purged {cache.purge(older_than)} cached bulletins")
@@ -0,0 +1,115 @@
+import argparse
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import TimeoutError
+
+import bulletin_backends
+import bulletin_batch
+import bulletin_render_cache
+
+BULLETIN_PATH = re.compile(r'^/bulletin/(\d{4}-\d{2}-\d{2})\.pdf$')
+# Seconds a request waits for its bulletin before giving up
+RENDER_TIMEOUT = 60
+# Bytes written to the socket per chunk when streaming a PDF back
+CHUNK_SIZE = 64 * 1024
+
+
+class BulletinService():
+    # Renders bulletins on demand in a bounded pool of warm worker processes
+    def __init__(self, workers=2, max_tasks_per_worker=bulletin_batch.DEFAULT_MAX_TASKS_PER_WORKER, max_pending=None):
+        self.pool = bulletin_batch.start_pool(workers, max_tasks_per_worker)
+        # Requests beyond this many are turned away instead of queueing without bound
+        self.pending = threading.BoundedSemaphore(max_pending or workers * 4)
+
+    def render(self, service_date):
+        if not self.pending.acquire(blocking=False):
+            raise OverflowError("Too many bulletins are already being rendered")
+        # The slot is freed when the worker is done with the task, not when the request gives
+        # up on it, so renders that time out still count until they leave the pool
+        try:
+            result = self.pool.apply_async(bulletin_batch.render_pdf, (service_date,), callback=self._finished, error_callback=self._finished)
+        except Exception:
+            self.pending.release()
+            raise
+        return result.get(RENDER_TIMEOUT)
+
+    def _finished(self, result):
+        self.pending.release()
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+
+class BulletinRequestHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_GET(self):
+        match = BULLETIN_PATH.match(self.path.split('?', 1)[0])
+        if match is None:
+            self.send_error(404, "Expected /bulletin/<service_date>.pdf")
+            return
+        service_date = match.group(1)
+        try:
+            pdf = self.service.render(service_date)
+        except OverflowError as e:
+            self.send_error(503, str(e))
+            return
+        except TimeoutError:
+            self.send_error(504, f"Timed out rendering bulletin for {service_date}")
+            return
+        except Exception as e:
+            self.send_error(500, f"Error building bulletin for {service_date}: {e}")
+            return
+        if pdf is None:
+            self.send_error(404, f"No bulletin found for service date: {service_date}")
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(len(pdf)))
+        self.send_header('Content-Disposition', f'inline; filename="bulletin-{service_date}.pdf"')
+        self.end_headers()
+        view = memoryview(pdf)
+        for start in range(0, len(pdf), CHUNK_SIZE):
+            self.wfile.write(view[start:start + CHUNK_SIZE])
+
+
+def serve(host='127.0.0.1', port=8080, workers=2, max_tasks_per_worker=bulletin_batch.DEFAULT_MAX_TASKS_PER_WORKER):
+    # Start the pool before any handler threads exist so workers fork from a clean process
+    service = BulletinService(workers, max_tasks_per_worker)
+    handler = type('Handler', (BulletinRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Serving bulletins on http://{host}:{port}/bulletin/<service_date>.pdf")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve bulletin PDFs over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=2, help="Number of worker processes rendering bulletins")
+    parser.add_argument('--max-tasks-per-worker', type=int, default=bulletin_batch.DEFAULT_MAX_TASKS_PER_WORKER,
+                        help="Bulletins a worker renders before it is recycled")
+    parser.add_argument('--render-cache', action='store_true', help="Serve unchanged bulletins from the render cache")
+    parser.add_argument('--render-cache-dir', default=bulletin_render_cache.DEFAULT_RENDER_CACHE_DIR,
+                        help="Directory used by --render-cache (default: %(default)s)")
+    parser.add_argument('--endpoint-url', default=bulletin_backends.DEFAULT_ENDPOINT, help="DynamoDB endpoint (default: %(default)s)")
+    parser.add_argument('--max-connections', type=int, default=bulletin_backends.DEFAULT_MAX_POOL_CONNECTIONS,
+                        help="HTTP connections to DynamoDB each worker keeps open (default: %(default)s)")
+    parser.add_argument('--data-dir', help="Read bulletin data from a directory of JSON files instead of DynamoDB")
+    args = parser.parse_args()
+    # Workers inherit these settings and each connects once, on its first fetch
+    bulletin_backends.configure_connections(endpoint_url=args.endpoint_url, max_pool_connections=args.max_connections)
+    if args.data_dir:
+        bulletin_backends.configure(bulletin_backends.FileBackend(args.data_dir))
+    if args.render_cache:
+        bulletin_render_cache.configure(args.render_cache_dir)
+    serve(args.host, args.port, args.workers, args.max_tasks_per_worker)
@@ -0,0 +1,132 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Frame
+from reportlab.platypus.flowables import Flowable
+
+import bulletin_metrics
+import bulletin_files
+import bulletin_render_cache
+
+# pdfrw turns a cached PDF page into a form XObject; without it regions are laid out every build
+try:
+    from pdfrw import PdfReader
+    from pdfrw.buildxobj import pagexobj
+    from pdfrw.toreportlab import makerl
+except ImportError:
+    PdfReader = None
+
+DEFAULT_STATIC_DIR = os.path.join('.bulletin-cache', 'static')
+# Tall enough for any region to be measured in a single frame
+MEASURE_HEIGHT = 10000
+# Matches the default padding of the bulletin's frames
+FRAME_PADDING = 6
+# Extra room around a region so strokes on its edges, and boxes as wide as the whole
+# frame, are not clipped by the form's bounding box
+BLEED = FRAME_PADDING + 2
+
+
+def available():
+    return PdfReader is not None
+
+
+class StaticRegion(Flowable):
+    # A pre-rendered block of the bulletin, placed as a form XObject
+    def __init__(self, key, pdf, width, height):
+        Flowable.__init__(self)
+        self.key = key
+        self.pdf = pdf
+        self.width = width
+        self.height = height
+        # The region already includes the frame padding, so centre it over the padded area
+        self.hAlign = 'CENTER'
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        # Convert the page once per document; repeated placements reuse the same form
+        doc = self.canv._doc
+        forms = doc.__dict__.setdefault('_static_forms', {})
+        name = forms.get(self.key)
+        if name is None:
+            name = makerl(self.canv, pagexobj(PdfReader(fdata=self.pdf).pages[0]))
+            forms[self.key] = name
+        self.canv.saveState()
+        self.canv.translate(-BLEED, -BLEED)
+        self.canv.doForm(name)
+        self.canv.restoreState()
+
+
+def _layout(flowables, width, height, canv):
+    frame = Frame(BLEED, BLEED, width, height, leftPadding=FRAME_PADDING, rightPadding=FRAME_PADDING, topPadding=0, bottomPadding=0)
+    for flowable in flowables:
+        if not frame.add(flowable, canv):
+            raise ValueError("Static region does not fit in a single frame")
+    return frame
+
+
+def render_region(flowables, width):
+    # Measure on a scratch canvas, then draw onto a page cut to exactly that height
+    frame = _layout(flowables, width, MEASURE_HEIGHT, Canvas(io.BytesIO()))
+    height = MEASURE_HEIGHT + BLEED - frame._y
+    buffer = io.BytesIO()
+    canv = Canvas(buffer, pagesize=(width + 2 * BLEED, height + 2 * BLEED), pageCompression=1, invariant=1)
+    _layout(flowables, width, height, canv)
+    canv.showPage()
+    canv.save()
+    return buffer.getvalue(), height
+
+
+class StaticRegionCache():
+    def __init__(self, directory=DEFAULT_STATIC_DIR):
+        self.directory = directory
+        self.regions = {}
+        self.lock = threading.Lock()
+
+    def region(self, name, width, make_flowables, key_parts=()):
+        # make_flowables is only called when the region has not been rendered before
+        digest = hashlib.sha1(json.dumps([name, width, bulletin_render_cache.code_version(), list(key_parts)]).encode('utf-8'))
+        key = f"{name}.{digest.hexdigest()}"
+        with self.lock:
+            rendered = self.regions.get(key)
+            if rendered is None:
+                bulletin_metrics.increment('cache_misses', cache='static')
+                rendered = self._load_or_render(key, width, make_flowables)
+                self.regions[key] = rendered
+            else:
+                bulletin_metrics.increment('cache_hits', cache='static')
+        # A fresh flowable per use, since flowables carry per-document drawing state
+        pdf, height = rendered
+        return StaticRegion(key, pdf, width, height)
+
+    def _load_or_render(self, key, width, make_flowables):
+        path = os.path.join(self.directory, f"{key}.pdf")
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                pdf = f.read()
+            height = float(PdfReader(fdata=pdf).pages[0].MediaBox[3]) - 2 * BLEED
+        else:
+            pdf, height = render_region(make_flowables(), width)
+            os.makedirs(self.directory, exist_ok=True)
+            with bulletin_files.atomic_write(path) as f:
+                f.write(pdf)
+        return pdf, height
+
+
+_default_regions = None
+
+
+def configure(directory=DEFAULT_STATIC_DIR):
+    global _default_regions
+    _default_regions = StaticRegionCache(directory)
+    return _default_regions
+
+
+def default_regions():
+    if _default_regions is None:
+        configure()
+    return _default_regions
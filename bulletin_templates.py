@@ -0,0 +1,111 @@
+import os
+import threading
+from collections import OrderedDict
+from jinja2 import BaseLoader, Environment, FileSystemBytecodeCache, TemplateNotFound, meta
+
+import bulletin_metrics
+
+# Number of compiled orders of worship kept in memory
+DEFAULT_CACHE_SIZE = 32
+
+
+class _SourceLoader(BaseLoader):
+    # Serves OOW lines by name so Jinja's bytecode cache can be used for them
+    def __init__(self):
+        self.sources = {}
+
+    def get_source(self, environment, template):
+        if template not in self.sources:
+            raise TemplateNotFound(template)
+        return self.sources[template], None, lambda: True
+
+
+class TemplateEngine():
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE, bytecode_cache_dir=None):
+        self.loader = _SourceLoader()
+        bytecode_cache = None
+        if bytecode_cache_dir is not None:
+            os.makedirs(bytecode_cache_dir, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+        # Compiled templates live in our own LRU, so Jinja's name cache is disabled
+        self.environment = Environment(loader=self.loader, bytecode_cache=bytecode_cache, cache_size=0)
+        self.cache_size = cache_size
+        self.compiled = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _compile(self, oow):
+        # Compiles every line once per version of an order of worship, and works out which
+        # params its lines use at the same time; both are kept together in the LRU
+        key = (oow.service_id, oow.version)
+        with self.lock:
+            compiled = self.compiled.get(key)
+            if compiled is not None:
+                self.compiled.move_to_end(key)
+                bulletin_metrics.increment('cache_hits', cache='templates')
+                return compiled
+            bulletin_metrics.increment('cache_misses', cache='templates')
+            templates = []
+            variables = set()
+            for i, section in enumerate(oow.sections):
+                section_templates = []
+                for j, line in enumerate(section.lines):
+                    name = f"{key[0]}@{key[1]}/{i}/{j}"
+                    self.loader.sources[name] = line.text
+                    try:
+                        section_templates.append(self.environment.get_template(name))
+                    finally:
+                        del self.loader.sources[name]
+                    variables |= meta.find_undeclared_variables(self.environment.parse(line.text))
+                templates.append(section_templates)
+            compiled = (templates, frozenset(variables))
+            self.compiled[key] = compiled
+            if len(self.compiled) > self.cache_size:
+                self.compiled.popitem(last=False)
+            return compiled
+
+    def compile_oow(self, oow):
+        return self._compile(oow)[0]
+
+    def oow_variables(self, oow):
+        # The params an order of worship's lines refer to
+        return self._compile(oow)[1]
+
+    def known_variables(self):
+        # Every param used by the orders of worship compiled so far
+        with self.lock:
+            return frozenset().union(*(variables for templates, variables in self.compiled.values()))
+
+    def render_oow(self, oow, params):
+        # A new OrderOfWorship with every line rendered; oow itself is left as it was
+        templates = self.compile_oow(oow)
+        sections = tuple(
+            section._replace(lines=tuple(line._replace(text=template.render(params)) for line, template in zip(section.lines, section_templates)))
+            for section, section_templates in zip(oow.sections, templates)
+        )
+        return oow._replace(sections=sections)
+
+
+_default_engine = None
+
+
+def configure(cache_size=DEFAULT_CACHE_SIZE, bytecode_cache_dir=None):
+    global _default_engine
+    _default_engine = TemplateEngine(cache_size=cache_size, bytecode_cache_dir=bytecode_cache_dir)
+    return _default_engine
+
+
+def default_engine():
+    # One engine per process, shared by every BulletinData
+    if _default_engine is None:
+        configure()
+    return _default_engine
+
+
+def _after_fork():
+    # A pooled batch's prefetch thread compiles orders of worship while the pool may be
+    # forking a replacement worker; the child must not inherit the lock held
+    if _default_engine is not None:
+        _default_engine.lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
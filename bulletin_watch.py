@@ -0,0 +1,59 @@
+import time
+
+import bulletin_backends
+import bulletin_cache
+import bulletin_files
+import bulletin_render_cache
+from bulletin_data import KEY_NAMES, PARAMS_TABLE, data_backend, prefetch_bulletin_data
+
+# Seconds between checks of the data source
+DEFAULT_INTERVAL = 0.5
+
+
+def watch_backend():
+    # Read the source itself so edits show up at once; a cache would hide them until its TTL
+    # expires. Offline there is no other source, so the cache is what gets watched.
+    cache = bulletin_cache.default_cache()
+    if cache is not None and cache.offline:
+        return data_backend()
+    return bulletin_backends.default_backend()
+
+
+def watch(builder, outputs, interval=DEFAULT_INTERVAL, backend=None):
+    # outputs maps each service date to the PDF it is written to. The builder stays warm,
+    # so compiled templates, the prepared logo and static regions are reused, and a date
+    # is re-rendered only when its params, its orders of worship or the logo change.
+    backend = backend or watch_backend()
+    rendered = {}
+    waiting = None
+    print(f"Watching {len(outputs)} bulletins; press Ctrl-C to stop")
+    try:
+        while True:
+            params_by_date = backend.get_items(PARAMS_TABLE, KEY_NAMES[PARAMS_TABLE], list(outputs))
+            missing = [service_date for service_date in outputs if service_date not in params_by_date]
+            if missing != waiting:
+                if missing:
+                    print(f"Waiting for bulletins dated {', '.join(missing)}")
+                waiting = missing
+            # cache=False keeps the item cache from wrapping the backend again
+            prefetched = prefetch_bulletin_data(list(params_by_date), cache=False, backend=backend, params_by_date=params_by_date)
+            for service_date, data in prefetched.items():
+                path = outputs[service_date]
+                key = bulletin_render_cache.render_key(data.output_params(), data.oows, builder.logo().path, builder.options())
+                if rendered.get(service_date) == key:
+                    continue
+                start = time.perf_counter()
+                try:
+                    # PDF viewers that reload on change never see a half-written file
+                    pdf = builder.render(service_date, data=data)
+                    with bulletin_files.atomic_write(path) as f:
+                        f.write(pdf)
+                except Exception as e:
+                    print(f"Error building bulletin for {service_date}: {e}")
+                else:
+                    print(f"Built {path} in {(time.perf_counter() - start) * 1000:.0f} ms")
+                # Remember failures too, so a broken edit is reported once rather than every poll
+                rendered[service_date] = key
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped watching")
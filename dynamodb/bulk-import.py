@@ -0,0 +1,153 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulletin_backends import YEAR_ATTRIBUTE, batch_get_items, connect_dynamodb, service_year
+from bulletin_data import KEY_NAMES, PARAMS_TABLE
+
+# PyYAML is only needed for YAML input
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Attribute holding a hash of the rest of the item, so unchanged items are not written again
+HASH_ATTRIBUTE = 'import_hash'
+DEFAULT_WORKERS = 4
+
+
+def read_rows(path):
+    # Items from a JSON, YAML or CSV file, as plain Python values
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, encoding='utf-8', newline='') as f:
+        if extension == '.csv':
+            return [csv_item(row) for row in csv.DictReader(f)]
+        if extension in ('.yaml', '.yml'):
+            if yaml is None:
+                raise SystemExit(f"PyYAML is needed to read {path} (pip install pyyaml)")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def csv_item(row):
+    # Empty cells are left out, cells holding a JSON list or object are decoded, and
+    # dotted column names nest, so an oow_id.morning column fills item['oow_id']['morning'].
+    # Text that merely starts with a bracket, such as "[Note] Choir practice", stays text.
+    item = {}
+    for column, value in row.items():
+        if value is None or value == '':
+            continue
+        if value[:1] in '[{':
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        target = item
+        *parents, name = column.split('.')
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[name] = value
+    return item
+
+
+def items_by_table(data, table_name=None):
+    # A file holds a list of items, or an object of {table name: [items]}; without
+    # --table an item's key attribute decides which table it belongs to
+    if isinstance(data, dict) and set(data) <= set(KEY_NAMES):
+        return {name: list(items) for name, items in data.items()}
+    if isinstance(data, dict):
+        data = [data]
+    tables = {}
+    for item in data:
+        name = table_name or next((name for name, key_name in KEY_NAMES.items() if key_name in item), None)
+        if name is None:
+            raise SystemExit(f"Cannot tell which table this item belongs to: {json.dumps(item)[:80]}")
+        tables.setdefault(name, []).append(item)
+    return tables
+
+
+def to_dynamodb(value):
+    # DynamoDB has no float type, and dates from YAML must be stored as strings
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {str(key): to_dynamodb(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_dynamodb(item) for item in value]
+    if isinstance(value, (str, int, bool, Decimal)) or value is None:
+        return value
+    return str(value)
+
+
+def content_hash(item):
+    content = {key: value for key, value in item.items() if key != HASH_ATTRIBUTE}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def write_items(table_name, key_name, items):
+    # Each worker thread writes through its own resource; batch_writer groups items into
+    # 25-item BatchWriteItem requests and re-sends any the service leaves unprocessed
+    table = connect_dynamodb().Table(table_name)
+    with table.batch_writer(overwrite_by_pkeys=[key_name]) as batch:
+        for item in items:
+            batch.put_item(Item=item)
+    return len(items)
+
+
+def import_table(table_name, rows, workers=DEFAULT_WORKERS, force=False, dry_run=False):
+    key_name = KEY_NAMES[table_name]
+    items = {}
+    for row in rows:
+        item = to_dynamodb(row)
+        if key_name not in item:
+            print(f"Skipping an item without {key_name} for {table_name}")
+            continue
+        item[key_name] = str(item[key_name])
+        if table_name == PARAMS_TABLE:
+            # Keeps the bulletin in the year index used for date-range queries
+            item[YEAR_ATTRIBUTE] = service_year(item[key_name])
+        item[HASH_ATTRIBUTE] = content_hash(item)
+        items[item[key_name]] = item
+
+    changed = list(items.values())
+    if not force:
+        # Read back only the stored hashes and drop the items that have not changed
+        stored = batch_get_items(connect_dynamodb(), table_name, key_name, list(items), attributes=[HASH_ATTRIBUTE])
+        changed = [item for key, item in items.items() if stored.get(key, {}).get(HASH_ATTRIBUTE) != item[HASH_ATTRIBUTE]]
+    if dry_run or not changed:
+        return len(changed), len(items) - len(changed)
+
+    slices = [changed[i::workers] for i in range(workers) if changed[i::workers]]
+    with ThreadPoolExecutor(max_workers=len(slices)) as executor:
+        written = sum(executor.map(lambda items: write_items(table_name, key_name, items), slices))
+    return written, len(items) - len(changed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load bulletin params and orders of worship into DynamoDB from JSON, YAML or CSV files.")
+    parser.add_argument('files', nargs='+', help="Files holding a list of items, or an object of {table name: [items]}")
+    parser.add_argument('--table', choices=sorted(KEY_NAMES), help="Table for every item (default: decided by each item's key)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Threads writing in parallel (default: %(default)s)")
+    parser.add_argument('--force', action='store_true', help="Write every item, even those whose content has not changed")
+    parser.add_argument('--dry-run', action='store_true', help="Report what would be written without writing")
+    args = parser.parse_args()
+
+    tables = {}
+    for path in args.files:
+        for table_name, rows in items_by_table(read_rows(path), args.table).items():
+            tables.setdefault(table_name, []).extend(rows)
+
+    start = time.perf_counter()
+    for table_name, rows in tables.items():
+        written, unchanged = import_table(table_name, rows, max(1, args.workers), args.force, args.dry_run)
+        verb = "Would write" if args.dry_run else "Wrote"
+        print(f"{verb} {written} items to {table_name} ({unchanged} unchanged)")
+    print(f"Finished in {time.perf_counter() - start:.2f}s")
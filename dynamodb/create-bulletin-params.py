@@ -16,11 +16,28 @@ attribute_definitions = [
         'AttributeName': 'service_date',
         'AttributeType': 'S'
     },
+    {
+        'AttributeName': 'service_year',
+        'AttributeType': 'S'
+    },
 ]
 provisioned_throughput = {
     'ReadCapacityUnits': 10,
     'WriteCapacityUnits': 10
 }
+# Bulletins by year, sorted by date, so a date range is a Query rather than a Scan.
+# Existing tables get this index from migrate-bulletin-params.py
+global_secondary_indexes = [
+    {
+        'IndexName': 'ServiceYearIndex',
+        'KeySchema': [
+            {'AttributeName': 'service_year', 'KeyType': 'HASH'},
+            {'AttributeName': 'service_date', 'KeyType': 'RANGE'},
+        ],
+        'Projection': {'ProjectionType': 'ALL'},
+        'ProvisionedThroughput': provisioned_throughput,
+    }
+]
 
 # Create the table only if it does not already exist
 try:
@@ -31,6 +48,7 @@ except dynamodb.exceptions.ResourceNotFoundException:
         TableName=table_name,
         KeySchema=key_schema,
         AttributeDefinitions=attribute_definitions,
+        GlobalSecondaryIndexes=global_secondary_indexes,
         ProvisionedThroughput=provisioned_throughput
     )
     print(f"Table {table_name} has been created. Status: {response['TableDescription']['TableStatus']}")
@@ -10,6 +10,7 @@ TABLE_NAME="BulletinParams"
 # Define the JSON document to be inserted
 JSON_DOC='{
     "service_date": {"S": "2023-08-20"},
+    "service_year": {"S": "2023"},
     "announcements": {"L": [
         {"S": "<b>Corporate Prayer Meeting:</b> Prayer meeting prior to the worship service beginning at 10:15 am. Corporate prayer is an excellent way to prepare your heart for worship."},
         {"S": "<b>Evening Worship:</b> Please join us tonight as we continue our sermon series through Genesis— <i>The Sabbath; A Creation Ordinance</i>"},
@@ -10,6 +10,7 @@ TABLE_NAME="BulletinParams"
 # Define the JSON document to be inserted
 JSON_DOC='{
     "service_date": {"S": "2023-08-27"},
+    "service_year": {"S": "2023"},
     "date": {"S": "August 27th, 2023"},
     "oow_id": {"M": {
         "morning": {"S": "morning"},
@@ -0,0 +1,95 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulletin_backends import YEAR_ATTRIBUTE, YEAR_INDEX, connect_dynamodb, service_year
+from bulletin_data import KEY_NAMES, PARAMS_TABLE
+
+# Adds the year index to an existing BulletinParams table and fills in the year of every
+# item, so date ranges can be read with Query. Safe to run again; finished steps are skipped.
+
+def add_index(client, table_name, key_name):
+    description = client.describe_table(TableName=table_name)['Table']
+    if any(index['IndexName'] == YEAR_INDEX for index in description.get('GlobalSecondaryIndexes', [])):
+        print(f"{table_name} already has {YEAR_INDEX}")
+        return False
+    throughput = description.get('ProvisionedThroughput', {})
+    create = {
+        'IndexName': YEAR_INDEX,
+        'KeySchema': [
+            {'AttributeName': YEAR_ATTRIBUTE, 'KeyType': 'HASH'},
+            {'AttributeName': key_name, 'KeyType': 'RANGE'},
+        ],
+        'Projection': {'ProjectionType': 'ALL'},
+    }
+    if throughput.get('ReadCapacityUnits'):
+        create['ProvisionedThroughput'] = {
+            'ReadCapacityUnits': throughput['ReadCapacityUnits'],
+            'WriteCapacityUnits': throughput['WriteCapacityUnits'],
+        }
+    client.update_table(
+        TableName=table_name,
+        AttributeDefinitions=[
+            {'AttributeName': YEAR_ATTRIBUTE, 'AttributeType': 'S'},
+            {'AttributeName': key_name, 'AttributeType': 'S'},
+        ],
+        GlobalSecondaryIndexUpdates=[{'Create': create}],
+    )
+    print(f"Creating {YEAR_INDEX} on {table_name}")
+    return True
+
+
+def wait_for_index(client, table_name, timeout=600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        indexes = client.describe_table(TableName=table_name)['Table'].get('GlobalSecondaryIndexes', [])
+        status = next((index['IndexStatus'] for index in indexes if index['IndexName'] == YEAR_INDEX), None)
+        if status == 'ACTIVE':
+            return True
+        time.sleep(5)
+    print(f"{YEAR_INDEX} is still not active after {timeout}s; it will finish building in the background")
+    return False
+
+
+def backfill_years(dynamodb, table_name, key_name, dry_run=False):
+    # Scan once, reading only keys and years, and set the year on items that lack it
+    table = dynamodb.Table(table_name)
+    scan = {
+        'ProjectionExpression': '#key, #year',
+        'ExpressionAttributeNames': {'#key': key_name, '#year': YEAR_ATTRIBUTE},
+    }
+    updated = 0
+    while True:
+        response = table.scan(**scan)
+        for item in response.get('Items', []):
+            year = service_year(item[key_name])
+            if item.get(YEAR_ATTRIBUTE) == year:
+                continue
+            if not dry_run:
+                table.update_item(
+                    Key={key_name: item[key_name]},
+                    UpdateExpression='SET #year = :year',
+                    ExpressionAttributeNames={'#year': YEAR_ATTRIBUTE},
+                    ExpressionAttributeValues={':year': year},
+                )
+            updated += 1
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Make BulletinParams queryable by date range.")
+    parser.add_argument('--dry-run', action='store_true', help="Only report the items that need a year")
+    args = parser.parse_args()
+
+    dynamodb = connect_dynamodb()
+    key_name = KEY_NAMES[PARAMS_TABLE]
+    if not args.dry_run and add_index(dynamodb.meta.client, PARAMS_TABLE, key_name):
+        wait_for_index(dynamodb.meta.client, PARAMS_TABLE)
+    updated = backfill_years(dynamodb, PARAMS_TABLE, key_name, args.dry_run)
+    print(f"{'Would set' if args.dry_run else 'Set'} {YEAR_ATTRIBUTE} on {updated} items")
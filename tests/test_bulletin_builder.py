@@ -0,0 +1,24 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+from bulletin_builder import RectWithTable
+
+STYLE = ParagraphStyle(name='Test', fontName='Times-Roman', fontSize=12, leading=12)
+LONG_TEXT = ' '.join(['As it is of the law of nature that a due proportion of time be set apart for the worship of God.'] * 60)
+
+
+def build(rows):
+    doc = SimpleDocTemplate(io.BytesIO(), pagesize=(300, 400))
+    doc.build([RectWithTable(doc.width, 100, rows)])
+    return doc.page
+
+
+def test_box_taller_than_a_frame_splits():
+    # The body is one paragraph taller than the page, so it can only be split inside its row
+    assert build([[Paragraph("<b>TITLE</b>", STYLE)], [Paragraph(LONG_TEXT, STYLE)]]) > 1
@@ -0,0 +1,51 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Frame, Paragraph
+
+from bulletin_paragraphs import CachedParagraph, ParagraphCache
+
+STYLE = ParagraphStyle(name='Test', fontName='Times-Roman', fontSize=10, leading=12)
+LONG_TEXT = ' '.join(['All blessings to Jehovah be ascribed forever then.'] * 20)
+
+
+def test_cached_paragraph_wraps_like_paragraph():
+    cached = ParagraphCache().paragraph(LONG_TEXT, STYLE)
+    assert cached.wrap(200, 1000) == Paragraph(LONG_TEXT, STYLE).wrap(200, 1000)
+
+
+def test_split_cached_paragraph():
+    paragraphs = ParagraphCache()
+    cached = paragraphs.paragraph(LONG_TEXT, STYLE)
+    width, height = cached.wrap(200, 1000)
+    pieces = cached.split(200, height / 2)
+    assert len(pieces) == 2
+    assert all(isinstance(piece, CachedParagraph) for piece in pieces)
+    assert sum(piece.wrap(200, 1000)[1] for piece in pieces) == height
+    # The shared line breaks are untouched by the split
+    assert paragraphs.paragraph(LONG_TEXT, STYLE).wrap(200, 1000) == (width, height)
+
+
+def test_split_across_frames():
+    canv = Canvas(io.BytesIO())
+    first = Frame(0, 0, 212, 100)
+    story = [ParagraphCache().paragraph(LONG_TEXT, STYLE)]
+    first.addFromList(story, canv)
+    assert len(story) == 1
+    second = Frame(0, 0, 212, 1000)
+    second.addFromList(story, canv)
+    assert story == []
+
+
+def test_wrap_state_leaves_out_the_canvas():
+    paragraphs = ParagraphCache()
+    canv = Canvas(io.BytesIO())
+    paragraphs.paragraph(LONG_TEXT, STYLE).wrapOn(canv, 300, 1000)
+    (parsed, wraps), = paragraphs.entries.values()
+    assert 'canv' not in wraps[300]
+    assert 'blPara' in wraps[300]